@@ -3,14 +3,44 @@ Data Validation and Synchronization Module
 Ensures employee hours are matched, verified, and synchronized correctly.
 Uses master_employee.json and Google Sheet Employee Master as authoritative sources.
 """
+import atexit
 import json
 import difflib
+import math
 import re
+import sys
+import threading
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    print("⚠️ WARNING: Library 'rapidfuzz' not found. Name matching will fall back to difflib (slower).")
+    print("Please run: pip install rapidfuzz")
+    RAPIDFUZZ_AVAILABLE = False
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to the standard json module
+
+# Excel writer engine: xlsxwriter streams XML and is much faster than openpyxl
+try:
+    import xlsxwriter  # noqa: F401 (used by pandas through engine name)
+    EXCEL_ENGINE = "xlsxwriter"
+except ImportError:
+    print("⚠️ WARNING: Library 'xlsxwriter' not found. Excel export will use openpyxl (slower).")
+    print("Please run: pip install xlsxwriter")
+    EXCEL_ENGINE = "openpyxl"
+
 # --- חדש: ייבוא הרשימה המרכזית ---
 # זה הופך את הרשימה ב-report_parser למקור האמת היחיד לשמות
 try:
@@ -21,9 +51,24 @@ except ImportError:
 # --- סוף קטע חדש ---
 
 
+# Name normalization: dashes/quotes -> spaces (single str.translate pass)
+_DASH_QUOTE_TABLE = str.maketrans('-"\'', '   ')
+_HEBREW_RE = re.compile(r'[\u0590-\u05FF]')
+
 # Master data cache
 _MASTER_DATA = None
 _MASTER_EMPLOYEE_DICT = None  # {employee_name: {company_name, standard_hours}}
+_MASTER_SOURCE = None  # (master file path, mtime in ns or None if missing) of the loaded data
+_MASTER_NORM_LIST = None  # normalized lowercase MASTER_EMPLOYEE_LIST, same order
+_MASTER_NORM_INDEX = None  # {normalized_lower_name: index in MASTER_EMPLOYEE_LIST}
+_MASTER_LEN_BUCKETS = None  # {name length: [indices in MASTER_EMPLOYEE_LIST]}
+
+# Match results for the central master list: {(employee_name, threshold): (matched_name, match_ratio)}
+_MATCH_CACHE = {}
+
+# Sync log file handle (opened once, closed at exit)
+_LOG_FH = None
+_LOG_LOCK = threading.Lock()  # Serializes log writes from worker threads
 
 
 def load_master_data(master_file: str = "master_employee.json") -> Dict:
@@ -31,13 +76,24 @@ def load_master_data(master_file: str = "master_employee.json") -> Dict:
     Load master employee data from JSON file.
     Returns dict with master_employees list.
     """
-    global _MASTER_DATA, _MASTER_EMPLOYEE_DICT
+    global _MASTER_DATA, _MASTER_EMPLOYEE_DICT, _MASTER_SOURCE
+    global _MASTER_NORM_LIST, _MASTER_NORM_INDEX, _MASTER_LEN_BUCKETS
     
-    if _MASTER_DATA is not None:
+    # Reuse the loaded data unless the master file changed since (one stat call)
+    master_path = Path(master_file)
+    try:
+        master_mtime = master_path.stat().st_mtime_ns
+    except OSError:
+        master_mtime = None
+    source = (str(master_path), master_mtime)
+    if _MASTER_DATA is not None and source == _MASTER_SOURCE:
         return _MASTER_DATA
+    _MASTER_SOURCE = source
     
-    master_path = Path(master_file)
-    if not master_path.exists():
+    # Normalize master names once for all matching calls
+    _MASTER_NORM_LIST, _MASTER_NORM_INDEX, _MASTER_LEN_BUCKETS = _build_norm_table(MASTER_EMPLOYEE_LIST)
+    
+    if master_mtime is None:
         log_message(f"⚠️ Master file not found: {master_file}")
         # --- שונה: שימוש ברשימה המיובאת ---
         _MASTER_DATA = {"master_employees": [{"employee_name": name} for name in MASTER_EMPLOYEE_LIST]}
@@ -47,8 +103,11 @@ def load_master_data(master_file: str = "master_employee.json") -> Dict:
         # --- סוף שינוי ---
     
     try:
-        with open(master_path, "r", encoding="utf-8") as f:
-            _MASTER_DATA = json.load(f)
+        if orjson:
+            _MASTER_DATA = orjson.loads(master_path.read_bytes())
+        else:
+            with open(master_path, "r", encoding="utf-8") as f:
+                _MASTER_DATA = json.load(f)
         
         # Build lookup dict for quick access
         _MASTER_EMPLOYEE_DICT = {}
@@ -91,17 +150,75 @@ def get_master_employee_dict() -> Dict:
     return _MASTER_EMPLOYEE_DICT or {}
 
 
+def _is_master_list(master_names) -> bool:
+    """True if master_names is the central master list (normalized once by load_master_data)."""
+    return master_names is MASTER_EMPLOYEE_LIST
+
+
+def _build_norm_table(master_names: List[str]) -> Tuple[List[str], Dict[str, int], Dict[int, List[int]]]:
+    """
+    Normalize master names for matching.
+    
+    Returns:
+        Tuple of (normalized lowercase names, {normalized name: first index},
+        {name length: indices})
+    """
+    norm_list = [normalize_name(master_name).lower() for master_name in master_names]
+    norm_index = {}
+    len_buckets = defaultdict(list)
+    for index, master_norm in enumerate(norm_list):
+        norm_index.setdefault(master_norm, index)
+        len_buckets[len(master_norm)].append(index)
+    return norm_list, norm_index, dict(len_buckets)
+
+
+def _get_master_norm_table(master_names: List[str]) -> Tuple[List[str], Dict[str, int], Dict[int, List[int]]]:
+    """
+    Get normalized names, exact-match index and length buckets for master_names.
+    Uses the table built by load_master_data for the central master list.
+    """
+    if _is_master_list(master_names):
+        if _MASTER_NORM_LIST is None:
+            load_master_data()
+        return _MASTER_NORM_LIST, _MASTER_NORM_INDEX, _MASTER_LEN_BUCKETS
+    return _build_norm_table(master_names)
+
+
 def normalize_name(name: str) -> str:
     """
     Normalize employee name for matching.
-    Removes extra spaces, dashes, quotes.
+    Applies NFKC (visually identical code point sequences become equal),
+    removes extra spaces, dashes, quotes.
     """
     if not name or not isinstance(name, str):
         return ""
-    name = name.strip()
-    name = re.sub(r'[-"\']', ' ', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name
+    return _normalize_str(name)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_str(name: str) -> str:
+    """Cached body of normalize_name (str input only, so the cache key is always hashable)."""
+    name = unicodedata.normalize('NFKC', name)
+    # split() drops leading/trailing whitespace and collapses inner runs
+    return ' '.join(name.translate(_DASH_QUOTE_TABLE).split())
+
+
+@lru_cache(maxsize=4096)
+def _sort_tokens(name: str) -> str:
+    """
+    Sort name tokens so word order doesn't affect matching (first/last swap).
+    Matches rapidfuzz's token_sort_ratio preprocessing for the difflib fallback.
+    """
+    return ' '.join(sorted(name.split()))
+
+
+@lru_cache(maxsize=4096)
+def _master_matcher(master_norm: str) -> difflib.SequenceMatcher:
+    """
+    SequenceMatcher with master_norm as seq2, reused across queries.
+    SequenceMatcher caches its seq2 analysis, so only set_seq1(query) is needed per comparison.
+    """
+    return difflib.SequenceMatcher(None, "", master_norm)
 
 
 def fix_rtl_name(name: str) -> str:
@@ -110,7 +227,13 @@ def fix_rtl_name(name: str) -> str:
     """
     if not name or not isinstance(name, str):
         return name
-    if any('\u0590' <= c <= '\u05FF' for c in name):
+    return _fix_rtl_str(name)
+
+
+@lru_cache(maxsize=4096)
+def _fix_rtl_str(name: str) -> str:
+    """Cached body of fix_rtl_name (str input only, so the cache key is always hashable)."""
+    if _HEBREW_RE.search(name):
         return name[::-1]
     return name
 
@@ -119,7 +242,8 @@ def match_employee_name(employee_name: str, master_names: Optional[List[str]] =
                         threshold: float = 0.7) -> Tuple[Optional[str], float]:
     """
     Match employee name to master list using fuzzy matching.
-    Returns (matched_name, match_ratio) or (None, 0.0) if no match found.
+    Returns (matched_name, match_ratio), or (None, best_ratio) if no name reaches the threshold
+    (best_ratio is the closest master name's score, shown in the unmatched-employee log/report).
     
     Args:
         employee_name: Name to match
@@ -143,42 +267,230 @@ def match_employee_name(employee_name: str, master_names: Optional[List[str]] =
     if not master_names:
         return None, 0.0
     
+    # Reuse earlier matches against the central master list
+    if _is_master_list(master_names):
+        cache_key = (employee_name, threshold)
+        if cache_key not in _MATCH_CACHE:
+            _MATCH_CACHE[cache_key] = _match_name(employee_name, master_names, threshold)
+        return _MATCH_CACHE[cache_key]
+    
+    return _match_name(employee_name, master_names, threshold)
+
+
+def _match_name(employee_name: str, master_names: List[str], threshold: float,
+                norm_table: Optional[Tuple[List[str], Dict[str, int], Dict[int, List[int]]]] = None
+                ) -> Tuple[Optional[str], float]:
+    """
+    Match a single name to master_names (uncached). See match_employee_name.
+    norm_table is _get_master_norm_table(master_names), passed in by callers that match many names.
+    """
     # Normalize input name
-    name_norm = normalize_name(employee_name)
+    name_norm = normalize_name(employee_name).lower()
+    if norm_table is None:
+        norm_table = _get_master_norm_table(master_names)
+    master_norm_list, master_norm_index, master_len_buckets = norm_table
     
     # First check: exact match (case-insensitive, normalized)
-    for master_name in master_names:
-        master_norm = normalize_name(master_name)
-        if name_norm.lower() == master_norm.lower():
-            return master_name, 1.0
+    if name_norm in master_norm_index:
+        return master_names[master_norm_index[name_norm]], 1.0
     
     # Second check: fuzzy match on normalized names
-    best_match = None
-    best_ratio = 0.0
+    best_index, best_ratio = _best_fuzzy_match(name_norm, master_norm_list, threshold, master_len_buckets)
+    
+    # Third check: try reversed name (RTL fix) - only Hebrew names can be reversed
+    if best_index is None and _HEBREW_RE.search(name_norm):
+        name_reversed = name_norm[::-1]  # Hebrew already detected, so fix_rtl_name would just reverse
+        best_index, reversed_ratio = _best_fuzzy_match(name_reversed, master_norm_list, threshold, master_len_buckets)
+        best_ratio = max(best_ratio, reversed_ratio)
     
-    for master_name in master_names:
-        master_norm = normalize_name(master_name)
-        ratio = difflib.SequenceMatcher(None, name_norm.lower(), master_norm.lower()).ratio()
+    if best_index is not None:
+        return master_names[best_index], best_ratio
+    
+    return None, best_ratio
+
+
+def _best_fuzzy_match(query: str, choices: List[str], threshold: float,
+                      len_buckets: Optional[Dict[int, List[int]]] = None) -> Tuple[Optional[int], float]:
+    """
+    Find the choice most similar to query, ignoring word order (token sort ratio).
+    Uses rapidfuzz (C++) when available, difflib otherwise.
+    With len_buckets ({length: indices}), difflib only scores choices whose
+    length allows a ratio >= threshold.
+    
+    Returns:
+        Tuple of (index in choices, match_ratio), or (None, best_ratio) if below threshold
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        # No score_cutoff: a miss still reports its best score
+        best = process.extractOne(query, choices, scorer=fuzz.token_sort_ratio)
+        if best is None:
+            return None, 0.0
+        _, score, index = best
+        if score >= threshold * 100:
+            return index, score / 100
+        return None, score / 100
+    
+    query = _sort_tokens(query)
+    candidates = range(len(choices))
+    if len_buckets is not None and threshold > 0:
+        # ratio <= 2*min(len)/(len(a)+len(b)), so skip lengths that can't reach threshold
+        # (sorting tokens doesn't change length)
+        query_len = len(query)
+        min_len = math.ceil(query_len * threshold / (2 - threshold) - 1e-9)
+        max_len = math.floor(query_len * (2 - threshold) / threshold + 1e-9)
+        candidates = sorted(
+            index for length in range(min_len, max_len + 1) for index in len_buckets.get(length, ())
+        )
+    
+    scored = set()
+    best_index, best_ratio = _best_difflib_ratio(query, choices, candidates, threshold, scored=scored)
+    if best_index is not None and best_ratio >= threshold:
+        return best_index, best_ratio
+    
+    # No match: for the reported best ratio, score only the choices the pass above skipped,
+    # starting from its best ratio as the bound
+    skipped = (index for index in range(len(choices)) if index not in scored)
+    _, best_ratio = _best_difflib_ratio(query, choices, skipped, 0.0, best_ratio=best_ratio)
+    return None, best_ratio
+
+
+def _best_difflib_ratio(query: str, choices: List[str], candidates, min_ratio: float,
+                        best_ratio: float = 0.0, scored: Optional[set] = None) -> Tuple[Optional[int], float]:
+    """
+    difflib scan over choices[candidates] (query already token-sorted).
+    Candidates whose upper bounds can't reach min_ratio or beat best_ratio (the best so far) are skipped.
+    Indices whose full ratio was computed are added to scored, if given.
+    
+    Returns:
+        Tuple of (index that beat the starting best_ratio or None, best ratio)
+    """
+    best_index = None
+    for index in candidates:
+        matcher = _master_matcher(_sort_tokens(choices[index]))
+        matcher.set_seq1(query)
+        # Cheap upper bounds first: skip candidates that can't beat the best so far
+        bound = max(best_ratio, min_ratio)
+        if matcher.real_quick_ratio() < bound or matcher.quick_ratio() < bound:
+            continue
+        ratio = matcher.ratio()
+        if scored is not None:
+            scored.add(index)
         if ratio > best_ratio:
             best_ratio = ratio
-            best_match = master_name
-    
-    # Third check: try reversed name (RTL fix)
-    if best_ratio < threshold:
-        name_reversed = fix_rtl_name(name_norm)
-        if name_reversed != name_norm:
-            for master_name in master_names:
-                master_norm = normalize_name(master_name)
-                ratio = difflib.SequenceMatcher(None, name_reversed.lower(), master_norm.lower()).ratio()
-                if ratio > best_ratio:
-                    best_ratio = ratio
-                    best_match = master_name
-    
-    # Return match only if above threshold
-    if best_match and best_ratio >= threshold:
-        return best_match, best_ratio
+            best_index = index
+            if best_ratio >= 1.0:
+                break  # Can't do better than a perfect match
+    return best_index, best_ratio
+
+
+def match_employee_names(employee_names: List[str], master_names: Optional[List[str]] = None,
+                         threshold: float = 0.7, workers: int = -1) -> List[Tuple[Optional[str], float]]:
+    """
+    Match a batch of employee names to master list.
+    With rapidfuzz, all names are scored against all master names in one cdist call,
+    which runs outside the GIL on `workers` threads.
     
-    return None, best_ratio
+    Args:
+        employee_names: Names to match
+        master_names: List of master names (if None, uses loaded master data)
+        threshold: Minimum similarity ratio (0-1)
+        workers: Threads used by rapidfuzz cdist (-1 = all cores)
+    
+    Returns:
+        List of (matched_name, match_ratio) tuples, one per input name
+    """
+    if master_names is None:
+        master_names = MASTER_EMPLOYEE_LIST
+    
+    if not master_names or not employee_names:
+        return [match_employee_name(name, master_names, threshold) for name in employee_names]
+    
+    # Normalized master names are built once for the whole batch (prebuilt for the central list)
+    norm_table = _get_master_norm_table(master_names)
+    use_cache = _is_master_list(master_names)
+    
+    if not RAPIDFUZZ_AVAILABLE:
+        matches = []
+        for name in employee_names:
+            if not name:
+                matches.append((None, 0.0))
+            elif use_cache:
+                cache_key = (name, threshold)
+                if cache_key not in _MATCH_CACHE:
+                    _MATCH_CACHE[cache_key] = _match_name(name, master_names, threshold, norm_table)
+                matches.append(_MATCH_CACHE[cache_key])
+            else:
+                matches.append(_match_name(name, master_names, threshold, norm_table))
+        return matches
+    
+    matches = [(None, 0.0)] * len(employee_names)
+    queries = [normalize_name(name).lower() for name in employee_names]
+    master_norm_list, master_norm_index, master_len_buckets = norm_table
+    
+    # First check: earlier matches and exact matches via index lookup
+    fuzzy = []
+    for i, name_norm in enumerate(queries):
+        if not employee_names[i]:
+            continue
+        if use_cache and (employee_names[i], threshold) in _MATCH_CACHE:
+            matches[i] = _MATCH_CACHE[(employee_names[i], threshold)]
+        elif name_norm in master_norm_index:
+            matches[i] = (master_names[master_norm_index[name_norm]], 1.0)
+        else:
+            fuzzy.append(i)
+    
+    # Second check: score remaining names against every master name at once
+    # (each distinct name is scored once, even if it appears in several reports)
+    retry = []
+    if fuzzy:
+        fuzzy_queries = list(dict.fromkeys(queries[i] for i in fuzzy))
+        best_matches = dict(zip(fuzzy_queries, _cdist_best_matches(fuzzy_queries, master_norm_list, threshold, workers)))
+        for i in fuzzy:
+            best_index, best_ratio = best_matches[queries[i]]
+            if best_index is not None:
+                matches[i] = (master_names[best_index], best_ratio)
+            else:
+                matches[i] = (None, best_ratio)  # Best score kept for the unmatched report
+                if _HEBREW_RE.search(queries[i]):
+                    retry.append((i, queries[i][::-1]))  # Hebrew already detected: reverse (RTL fix)
+    
+    # Third check: retry unmatched Hebrew names reversed (RTL fix)
+    if retry:
+        reversed_queries = list(dict.fromkeys(name_reversed for _, name_reversed in retry))
+        best_matches = dict(zip(reversed_queries, _cdist_best_matches(reversed_queries, master_norm_list, threshold, workers)))
+        for i, name_reversed in retry:
+            best_index, best_ratio = best_matches[name_reversed]
+            if best_index is not None:
+                matches[i] = (master_names[best_index], best_ratio)
+            else:
+                matches[i] = (None, max(matches[i][1], best_ratio))
+    
+    if use_cache:
+        for name, match in zip(employee_names, matches):
+            if name:
+                _MATCH_CACHE[(name, threshold)] = match
+    
+    return matches
+
+
+def _cdist_best_matches(queries: List[str], choices: List[str], threshold: float,
+                        workers: int = -1) -> List[Tuple[Optional[int], float]]:
+    """
+    Score all queries against all choices with rapidfuzz.process.cdist.
+    
+    Returns:
+        List of (index in choices, match_ratio) or (None, best_ratio) per query
+    """
+    cutoff = threshold * 100
+    # No score_cutoff: names below the threshold still report their best score
+    scores = process.cdist(queries, choices, scorer=fuzz.token_sort_ratio, workers=workers, dtype=np.float64)
+    best_indices = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(queries)), best_indices]
+    
+    return [
+        (int(index), float(score) / 100) if score > 0 and score >= cutoff else (None, float(score) / 100)
+        for index, score in zip(best_indices, best_scores)
+    ]
 
 
 def validate_hours(reported_hours: Optional[float], standard_hours: float, 
@@ -206,7 +518,51 @@ def validate_hours(reported_hours: Optional[float], standard_hours: float,
         return False, f"⚠️ Irregular Hours ({deviation_percent:.1f}% deviation)"
 
 
-def validate_and_unify_data(all_results: List[Dict], log_unmatched: bool = True) -> List[Dict]:
+def validate_hours_batch(reported_hours: List[Optional[float]], standard_hours: List[Optional[float]],
+                         tolerance_percent: float = 10.0) -> List[Tuple[bool, str]]:
+    """
+    Validate a batch of reported hours against standard hours (vectorized with NumPy).
+    Same rules and status messages as validate_hours.
+    
+    Args:
+        reported_hours: Hours reported by each employee
+        standard_hours: Standard hours from master data, aligned with reported_hours
+        tolerance_percent: Allowed deviation percentage (default 10%)
+    
+    Returns:
+        List of (is_valid, status_message) tuples
+    """
+    reported = np.array([np.nan if h is None else h for h in reported_hours], dtype=np.float64)
+    standard = np.array([np.nan if h is None else h for h in standard_hours], dtype=np.float64)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        can_validate = ~np.isnan(reported) & (standard > 0)
+        deviation_percent = np.abs(reported - standard) / standard * 100
+        within_tolerance = deviation_percent <= tolerance_percent
+    
+    results = []
+    for checked, ok, percent in zip(can_validate, within_tolerance, deviation_percent):
+        if not checked:
+            results.append((True, "No validation"))  # Can't validate if missing data
+        elif ok:
+            results.append((True, "OK"))
+        else:
+            results.append((False, f"⚠️ Irregular Hours ({percent:.1f}% deviation)"))
+    return results
+
+
+def _reported_hours(report_summary: Dict) -> Optional[float]:
+    """
+    Get reported hours: total_presence_hours, falling back to total_approved_hours.
+    A reported 0.0 is kept (only a missing value falls back).
+    """
+    presence_hours = report_summary.get("total_presence_hours")
+    if presence_hours is not None:
+        return presence_hours
+    return report_summary.get("total_approved_hours")
+
+
+def validate_and_unify_data(all_results: List[Dict], log_unmatched: bool = True, workers: int = -1) -> List[Dict]:
     """
     Validate and unify employee data from parsed reports.
     
@@ -218,6 +574,7 @@ def validate_and_unify_data(all_results: List[Dict], log_unmatched: bool = True)
     Args:
         all_results: List of parsed report results
         log_unmatched: Whether to log unmatched employees
+        workers: Threads used for batch name matching (-1 = all cores)
     
     Returns:
         List of validated and unified results
@@ -231,7 +588,7 @@ def validate_and_unify_data(all_results: List[Dict], log_unmatched: bool = True)
     # --- סוף שינוי ---
     
     validated_results = []
-    seen_names = set()  # For duplicate prevention
+    name_to_entry = {}  # norm_name -> validated result, for duplicate prevention and merging
     
     log_message(f"\n{'='*60}")
     log_message(f"Starting data validation for {len(all_results)} reports")
@@ -239,19 +596,37 @@ def validate_and_unify_data(all_results: List[Dict], log_unmatched: bool = True)
     
     unmatched_employees = []
     irregular_hours_count = 0
+    console_lines = []  # Per-report messages, printed to console in one write
     
-    for idx, result in enumerate(all_results, 1):
-        employee_name = result.get("employee_name")
-        if not employee_name:
-            log_message(f"Report {idx}: No employee name found")
-            continue
-        
+    def _log_record(message: str):
+        log_message(message, console=False)
+        console_lines.append(message)
+    
+    # Match all employee names to master in one batch
+    matches = match_employee_names([result.get("employee_name") for result in all_results], master_names, workers=workers)
+    
+    # Get reported hours (prefer total_presence_hours, fallback to total_approved_hours)
+    all_reported_hours = []
+    for result in all_results:
         report_summary = result.get("report_summary") or {}
         if not isinstance(report_summary, dict):
             report_summary = {}
+        all_reported_hours.append(_reported_hours(report_summary))
+    
+    # Validate hours for all reports at once (standard hours depend only on the matched name)
+    hours_checks = validate_hours_batch(
+        all_reported_hours,
+        [master_dict.get(matched_name, {}).get("standard_hours", 0.0) if matched_name else None
+         for matched_name, _ in matches]
+    )
+    
+    for idx, (result, (matched_name, match_ratio)) in enumerate(zip(all_results, matches), 1):
+        employee_name = result.get("employee_name")
+        if not employee_name:
+            _log_record(f"Report {idx}: No employee name found")
+            continue
         
-        # Match employee name to master
-        matched_name, match_ratio = match_employee_name(employee_name, master_names)
+        reported_hours = all_reported_hours[idx - 1]
         
         if matched_name:
             # Get master data
@@ -263,64 +638,63 @@ def validate_and_unify_data(all_results: List[Dict], log_unmatched: bool = True)
             norm_name = normalize_name(matched_name).lower()
             
             # Check for duplicates
-            if norm_name in seen_names:
-                log_message(f"⚠️ Report {idx}: Duplicate found for '{matched_name}' - merging data")
-                # Find existing entry and merge
-                for existing in validated_results:
-                    if normalize_name(existing.get("employee_name", "")).lower() == norm_name:
-                        # Merge report summaries
-                        existing_summary = existing.get("report_summary", {})
-                        new_summary = result.get("report_summary", {})
-                        
-                        # Keep higher value for each key
-                        for key, new_val in new_summary.items():
-                            if new_val is not None:
-                                existing_val = existing_summary.get(key)
-                                if existing_val is None or (isinstance(new_val, (int, float)) and new_val > existing_val):
-                                    existing_summary[key] = new_val
-                        break
+            existing = name_to_entry.get(norm_name)
+            if existing is not None:
+                _log_record(f"⚠️ Report {idx}: Duplicate found for '{matched_name}' - merging data")
+                # Merge report summaries into the existing entry
+                existing_summary = existing.get("report_summary", {})
+                new_summary = result.get("report_summary", {})
+                
+                # Keep higher value for each key
+                for key, new_val in new_summary.items():
+                    if new_val is not None:
+                        existing_val = existing_summary.get(key)
+                        if existing_val is None or (isinstance(new_val, (int, float)) and new_val > existing_val):
+                            existing_summary[key] = new_val
                 continue
             
-            seen_names.add(norm_name)
-            
-            # Get reported hours (prefer total_presence_hours, fallback to total_approved_hours)
-            reported_hours = report_summary.get("total_presence_hours") or report_summary.get("total_approved_hours")
-            
             # Validate hours
-            is_valid, status = validate_hours(reported_hours, standard_hours)
+            is_valid, status = hours_checks[idx - 1]
             if not is_valid:
                 irregular_hours_count += 1
-                log_message(f"⚠️ Report {idx}: Irregular hours for '{matched_name}': {reported_hours} vs {standard_hours} standard")
+                _log_record(f"⚠️ Report {idx}: Irregular hours for '{matched_name}': {reported_hours} vs {standard_hours} standard")
             
             # Create validated result
-            validated_result = result.copy()
-            validated_result["employee_name"] = matched_name  # Use matched name
-            validated_result["company_name"] = company_name
-            validated_result["standard_hours"] = standard_hours
-            validated_result["reported_hours"] = reported_hours
-            validated_result["hours_status"] = status
-            validated_result["match_ratio"] = match_ratio
+            validated_result = {
+                **result,
+                "employee_name": matched_name,  # Use matched name
+                "company_name": company_name,
+                "standard_hours": standard_hours,
+                "reported_hours": reported_hours,
+                "hours_status": status,
+                "match_ratio": match_ratio,
+            }
             
             validated_results.append(validated_result)
-            
-            log_message(f"✅ Report {idx}: '{employee_name}' → '{matched_name}' (match: {match_ratio:.2%}, status: {status})")
+            name_to_entry[norm_name] = validated_result
+            _log_record(f"✅ Report {idx}: '{employee_name}' → '{matched_name}' (match: {match_ratio:.2%}, status: {status})")
         else:
             # Unmatched employee
             unmatched_employees.append(employee_name)
             if log_unmatched:
-                log_message(f"⚠️ Report {idx}: Unmatched employee '{employee_name}' (best match ratio: {match_ratio:.2%})")
+                _log_record(f"⚠️ Report {idx}: Unmatched employee '{employee_name}' (best match ratio: {match_ratio:.2%})")
             
             # Add to results with CHECK prefix
-            validated_result = result.copy()
-            validated_result["employee_name"] = f"**CHECK: {employee_name}"
-            validated_result["company_name"] = ""
-            validated_result["standard_hours"] = None
-            validated_result["reported_hours"] = report_summary.get("total_presence_hours") or report_summary.get("total_approved_hours")
-            validated_result["hours_status"] = "Unmatched"
-            validated_result["match_ratio"] = match_ratio
+            validated_result = {
+                **result,
+                "employee_name": f"**CHECK: {employee_name}",
+                "company_name": "",
+                "standard_hours": None,
+                "reported_hours": reported_hours,
+                "hours_status": "Unmatched",
+                "match_ratio": match_ratio,
+            }
             
             validated_results.append(validated_result)
     
+    if console_lines:
+        sys.stdout.write("\n".join(console_lines) + "\n")
+    
     # Summary log
     log_message(f"\n{'='*60}")
     log_message(f"Validation Summary:")
@@ -329,6 +703,7 @@ def validate_and_unify_data(all_results: List[Dict], log_unmatched: bool = True)
     log_message(f"  - Unmatched employees: {len(unmatched_employees)}")
     log_message(f"  - Irregular hours: {irregular_hours_count}")
     log_message(f"{'='*60}\n")
+    flush_log()
     
     return validated_results
 
@@ -342,36 +717,56 @@ def generate_summary_table(validated_results: List[Dict]) -> pd.DataFrame:
     if not validated_results:
         return pd.DataFrame()
     
-    rows = []
-    for result in validated_results:
-        employee_name = result.get("employee_name", "")
-        company_name = result.get("company_name", "")
-        standard_hours = result.get("standard_hours")
-        reported_hours = result.get("reported_hours")
-        status = result.get("hours_status", "Unknown")
-        
-        # Calculate difference
-        if standard_hours is not None and reported_hours is not None:
-            difference = reported_hours - standard_hours
-        else:
-            difference = None
-        
-        rows.append({
-            "Employee Name": employee_name,
-            "Company": company_name,
-            "Standard Hours": standard_hours,
-            "Approved Hours": reported_hours,
-            "Difference": difference,
-            "Status": status
-        })
-    
-    df = pd.DataFrame(rows)
+    # Build columns directly (one array per column instead of one dict per row)
+    employee_names = [result.get("employee_name", "") for result in validated_results]
+    company_names = [result.get("company_name", "") for result in validated_results]
+    statuses = [result.get("hours_status", "Unknown") for result in validated_results]
+    standard_hours = np.array(
+        [np.nan if result.get("standard_hours") is None else result["standard_hours"] for result in validated_results],
+        dtype=np.float64
+    )
+    reported_hours = np.array(
+        [np.nan if result.get("reported_hours") is None else result["reported_hours"] for result in validated_results],
+        dtype=np.float64
+    )
+    
+    # Calculate difference (NaN where either value is missing)
+    difference = reported_hours - standard_hours
+    
+    df = pd.DataFrame({
+        "Employee Name": employee_names,
+        "Company": company_names,
+        "Standard Hours": standard_hours,
+        "Approved Hours": reported_hours,
+        "Difference": difference,
+        "Status": statuses
+    })
     return df
 
 
+def _get_log_fh():
+    """Open logs/sync_log.txt once and keep it open for the rest of the run."""
+    global _LOG_FH
+    if _LOG_FH is None:
+        # Ensure logs directory exists
+        logs_dir = Path("logs")
+        logs_dir.mkdir(exist_ok=True)
+        _LOG_FH = open(logs_dir / "sync_log.txt", "a", encoding="utf-8", buffering=8192)
+        atexit.register(_LOG_FH.close)
+    return _LOG_FH
+
+
+def flush_log():
+    """Flush buffered log lines to the log file."""
+    if _LOG_FH is not None:
+        with _LOG_LOCK:
+            _LOG_FH.flush()
+
+
 def log_message(message: str, console: bool = True):
     """
     Log message to both console and log file.
+    Log file writes are buffered; call flush_log() to force them to disk.
     
     Args:
         message: Message to log
@@ -380,16 +775,11 @@ def log_message(message: str, console: bool = True):
     if console:
         print(message)
     
-    # Ensure logs directory exists
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-    
-    log_file = logs_dir / "sync_log.txt"
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     try:
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {message}\n")
+        with _LOG_LOCK:
+            _get_log_fh().write(f"[{timestamp}] {message}\n")
     except Exception as e:
         # Fallback if logging fails
         if console:
@@ -415,7 +805,7 @@ def export_summary_table(df: pd.DataFrame, output_dir: str = "downloads/reports_
     filepath = output_path / filename
     
     try:
-        df.to_excel(filepath, index=False, engine='openpyxl')
+        df.to_excel(filepath, index=False, engine=EXCEL_ENGINE)
         log_message(f"✅ Summary table exported: {filepath}")
         return filepath
     except Exception as e:
@@ -437,19 +827,20 @@ def apply_vacation_completion(all_results: List[Dict], master_dict: Dict) -> Lis
     master_names = MASTER_EMPLOYEE_LIST
     # --- סוף שינוי ---
 
-    for result in all_results:
-        if not isinstance(result, dict):
-            continue
-
-        report_summary = result.get("report_summary")
-        if not isinstance(report_summary, dict):
-            continue
+    # Match all names in one batch (rapidfuzz cdist runs on all cores).
+    # Matches are cached, so validate_and_unify_data reuses them later in the run.
+    employee_names = [
+        result.get("employee_name")
+        if isinstance(result, dict) and isinstance(result.get("report_summary"), dict) else None
+        for result in all_results
+    ]
+    matches = match_employee_names(employee_names, master_names) if master_names else [(None, 0.0)] * len(all_results)
 
-        employee_name = result.get("employee_name")
+    for result, employee_name, (matched_name, _) in zip(all_results, employee_names, matches):
         if not employee_name:
             continue
 
-        matched_name, _ = match_employee_name(employee_name, master_names) if master_names else (None, 0.0)
+        report_summary = result["report_summary"]
         if matched_name:
             standard_hours = master_dict.get(matched_name, {}).get("standard_hours")
         else:
@@ -7,87 +7,72 @@ import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import numpy as np
-import difflib
 from data_validator import validate_and_unify_data, load_master_data, generate_summary_table, export_summary_table
+from data_validator import EXCEL_ENGINE, normalize_name
 
+# Validation metadata added by data_validator (kept over same-named report summary keys)
+VALIDATION_KEYS = ("company_name", "standard_hours", "reported_hours", "hours_status")
 
-def _fix_rtl_name(name: str) -> str:
+# Problem_Report tab columns
+PROBLEM_COLUMNS = ("file", "employee_name", "issue")
+
+# Helper columns added for deduplication (not exported)
+DEDUP_HELPER_COLS = ("norm_name", "norm_id", "has_id", "hour_count", "score")
+
+
+def _cell_value(value):
     """
-    Simple RTL name fix - reverses name if it contains Hebrew characters.
-    
-    Args:
-        name: Employee name string
-        
-    Returns:
-        Reversed name if Hebrew detected, original name otherwise
+    Value as written to a cell: None, str, bool and numbers as is, anything else
+    (dates, lists, other objects the engines can't write) as its str().
     """
-    if not name or not isinstance(name, str):
-        return name
-    # If name contains Hebrew characters, reverse it
-    return name[::-1] if any('\u0590' <= c <= '\u05FF' for c in name) else name
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    return str(value)
 
 
-def get_best_name_match(employee_name: str, master_names: list) -> str:
+def _write_sheet(writer, df, sheet_name):
     """
-    Find best matching employee name from master list using fuzzy matching.
-    Checks both original and reversed (RTL) name.
+    Write a DataFrame (header + rows, no index) to a new sheet of writer.
+    Both engines run in streaming mode (xlsxwriter constant_memory, openpyxl write_only):
+    only the current row is kept in memory and rows must be written top to bottom.
+    pandas' to_excel writes cell by cell/column by column, so the rows are written here directly.
     """
-    # --- חדש: בדיקה למניעת כפילות ---
-    if employee_name and employee_name.startswith("**CHECK:"):
-        return employee_name # השם כבר סומן כבעייתי, החזר אותו כמו שהוא
-    # --- סוף קטע חדש ---
+    # object array: plain Python values, missing values (NaN/None) as empty cells
+    header = [str(col) for col in df.columns]
+    values = df.astype(object).where(df.notna(), None).to_numpy()
+    # Numeric/bool columns already hold plain Python numbers; other columns may hold anything
+    for col_index, dtype in enumerate(df.dtypes):
+        if not pd.api.types.is_numeric_dtype(dtype):
+            values[:, col_index] = [_cell_value(value) for value in values[:, col_index]]
 
-    if not employee_name or not master_names:
-        if not master_names:
-            return f"**CHECK: {employee_name}" if employee_name else employee_name
-        return employee_name
-    
-    # Normalize employee name
-    name_norm = str(employee_name).strip()
-    name_norm = name_norm.replace('-', ' ').replace('"', ' ').replace("'", ' ')
-    name_norm = ' '.join(name_norm.split())
-    
-    # First check: original name
-    best_match = None
-    best_ratio = 0.0
-    
-    for master_name in master_names:
-        master_norm = str(master_name).strip()
-        master_norm = master_norm.replace('-', ' ').replace('"', ' ').replace("'", ' ')
-        master_norm = ' '.join(master_norm.split())
-        
-        # Calculate similarity ratio using difflib
-        ratio = difflib.SequenceMatcher(None, name_norm.lower(), master_norm.lower()).ratio()
-        if ratio > best_ratio and ratio >= 0.7:
-            best_ratio = ratio
-            best_match = master_name
-    
-    # Second check: reversed name (RTL fix)
-    if not best_match:
-        name_reversed = _fix_rtl_name(name_norm)
-        if name_reversed != name_norm:  # Only if name changed after reversal
-            for master_name in master_names:
-                master_norm = str(master_name).strip()
-                master_norm = master_norm.replace('-', ' ').replace('"', ' ').replace("'", ' ')
-                master_norm = ' '.join(master_norm.split())
-                
-                ratio = difflib.SequenceMatcher(None, name_reversed.lower(), master_norm.lower()).ratio()
-                if ratio > best_ratio and ratio >= 0.7:
-                    best_ratio = ratio
-                    best_match = master_name
-    
-    # Return matched name from master list if found
-    if best_match:
-        return best_match
-    
-    # Add CHECK prefix if no match found
-    return f"**CHECK: {employee_name}"
+    if writer.engine == "xlsxwriter":
+        worksheet = writer.book.add_worksheet(sheet_name)
+        header_format = writer.book.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        worksheet.write_row(0, 0, header, header_format)
+        for row_index, row in enumerate(values, start=1):
+            worksheet.write_row(row_index, 0, row)
+    else:
+        from openpyxl.cell import WriteOnlyCell  # only needed when xlsxwriter is missing
+        from openpyxl.styles import Font
 
+        worksheet = writer.book.create_sheet(sheet_name)
+        header_cells = []
+        for title in header:
+            cell = WriteOnlyCell(worksheet, value=title)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        worksheet.append(header_cells)
+        for row in values:
+            worksheet.append(row.tolist())
 
-def export_summary_excel(all_results, employee_names=None, debug_issues=None):
+
+def export_summary_excel(all_results, debug_issues=None):
     """
     Export validated and unified results to Excel.
     Now uses master_employee.json for validation and matching.
+    Names are unified once by validate_and_unify_data (data_validator).
     Also generates a 'Problem_Report' tab with all identified issues.
     """
     if (not all_results or not all_results) and (not debug_issues or not debug_issues):
@@ -95,9 +80,11 @@ def export_summary_excel(all_results, employee_names=None, debug_issues=None):
         return
 
     # --- אתחול רשימת הבעיות ---
-    problem_reports = []
+    # Kept as columns ({column: values}) - the Problem_Report DataFrame is built from them directly
+    problem_reports = {col: [] for col in PROBLEM_COLUMNS}
     if debug_issues:
-        problem_reports.extend(debug_issues)
+        for col in PROBLEM_COLUMNS:
+            problem_reports[col].extend(issue[col] for issue in debug_issues)
     # --- סוף קטע ---
 
     # Load master data
@@ -106,41 +93,33 @@ def export_summary_excel(all_results, employee_names=None, debug_issues=None):
     # Validate and unify data using master list
     validated_results = validate_and_unify_data(all_results, log_unmatched=True)
     
-    if not validated_results and not problem_reports:
+    if not validated_results and not problem_reports["file"]:
         print("⚠️ No validated results or debug issues to export.")
         return
     
     # --- ניתוח תוצאות הולידציה לאיתור בעיות ---
     if validated_results:
-        seen_problem_files = {p['file'] for p in problem_reports} # למנוע כפילויות
-        
-        for item in validated_results:
-            file = item.get("file", "N/A")
-            
-            if file in seen_problem_files:
-                continue
+        seen_problem_files = set(problem_reports["file"]) # למנוע כפילויות
 
-            name = item.get("employee_name", "N/A")
-            status = item.get("hours_status", "")
-            
-            # מקרה 1: עובד לא מזוהה
-            if "Unmatched" in status or (name and name.startswith("**CHECK:")):
-                 problem_reports.append({
-                     "file": file,
-                     "employee_name": name,
-                     "issue": "Unmatched Employee - Name not in Master List"
-                 })
-            
-            # --- מקרה 2: שעות חריגות (הוסר לבקשתך) ---
-            
-            # מקרה 3: נתונים חלקיים (שם נמצא, אך אין שעות)
-            # שונה ל-elif כדי למנוע דיווח כפול (אם עובד לא זוהה וגם חסרות לו שעות)
-            elif item.get("reported_hours") is None and "Unmatched" not in status:
-                 problem_reports.append({
-                    "file": file,
-                    "employee_name": name,
-                    "issue": "Partial Data - No presence/approved hours found"
-                 })
+        # All rows are checked at once (vectorized masks instead of a Python branch per item)
+        checks = pd.DataFrame(validated_results, columns=["file", "employee_name", "hours_status", "reported_hours"])
+        checks[["file", "employee_name"]] = checks[["file", "employee_name"]].fillna("N/A")
+
+        # מקרה 1: עובד לא מזוהה
+        unmatched = (checks["hours_status"].fillna("").astype(str).str.contains("Unmatched", regex=False)
+                     | checks["employee_name"].str.startswith("**CHECK:", na=False))
+
+        # --- מקרה 2: שעות חריגות (הוסר לבקשתך) ---
+
+        # מקרה 3: נתונים חלקיים (שם נמצא, אך אין שעות)
+        # רק לעובד מזוהה - כדי למנוע דיווח כפול (אם עובד לא זוהה וגם חסרות לו שעות)
+        partial = ~unmatched & checks["reported_hours"].isna()
+
+        checks["issue"] = np.where(unmatched, "Unmatched Employee - Name not in Master List",
+                                   "Partial Data - No presence/approved hours found")
+        report_mask = (unmatched | partial) & ~checks["file"].isin(seen_problem_files)
+        for col in PROBLEM_COLUMNS:
+            problem_reports[col].extend(checks.loc[report_mask, col].tolist())
     # --- סוף קטע חדש ---
 
     # --- המשך לוגיקה קיימת ---
@@ -148,30 +127,28 @@ def export_summary_excel(all_results, employee_names=None, debug_issues=None):
     
     if not validated_results:
         print("⚠️ No validated results to export (only debug report).")
-        flattened = []
+        flattened = None
     else:
-        # Flatten validated results
-        flattened = []
-        for item in validated_results:
-            base = {k: v for k, v in item.items() if k != "report_summary"}
-            summary = item.get("report_summary", {}) or {}
-
-            # Ensure all keys exist even if report summary is empty
-            base.update(summary)
-            
-            # Add validation metadata from data_validator
-            if "company_name" in item:
-                base["company_name"] = item.get("company_name", "")
-            if "standard_hours" in item:
-                base["standard_hours"] = item.get("standard_hours")
-            if "reported_hours" in item:
-                base["reported_hours"] = item.get("reported_hours")
-            if "hours_status" in item:
-                base["hours_status"] = item.get("hours_status", "")
-            
-            flattened.append(base)
+        # Flatten validated results in one pass: report_summary keys become "report_summary.<key>" columns
+        flattened = pd.json_normalize(validated_results, max_level=1)
+        summary_cols = [col for col in flattened.columns if col.startswith("report_summary.")]
+        summary_df = flattened[summary_cols].rename(columns=lambda col: col[len("report_summary."):])
+        flattened = flattened.drop(columns=summary_cols + ["report_summary"], errors="ignore")
+
+        # Report summary values override the item's, except the validation metadata from data_validator.
+        # Only rows whose report_summary has the key override it (an explicit None included)
+        summary_keys = [
+            item["report_summary"].keys() if isinstance(item.get("report_summary"), dict) else ()
+            for item in validated_results
+        ]
+        for key in summary_df.columns:
+            if key not in flattened.columns:
+                flattened[key] = summary_df[key]
+            elif key not in VALIDATION_KEYS:
+                has_key = np.array([key in keys for keys in summary_keys])
+                flattened[key] = summary_df[key].where(has_key, flattened[key])
 
-    if not flattened and not problem_reports:
+    if (flattened is None or flattened.empty) and not problem_reports["file"]:
         print("⚠️ No results to export to Excel (list was empty and no problems).")
         return
 
@@ -183,64 +160,68 @@ def export_summary_excel(all_results, employee_names=None, debug_issues=None):
 
     # --- שימוש ב-ExcelWriter לכתיבת טאבים מרובים ---
     try:
-        with pd.ExcelWriter(out_path, engine='openpyxl') as writer:
+        # Stream rows instead of keeping the whole workbook (a Python object per cell) in RAM:
+        # xlsxwriter flushes each row to disk, openpyxl write_only skips the cell object model
+        if EXCEL_ENGINE == "xlsxwriter":
+            engine_kwargs = {"options": {"constant_memory": True}}
+        else:
+            engine_kwargs = {"write_only": True}
+        with pd.ExcelWriter(out_path, engine=EXCEL_ENGINE, engine_kwargs=engine_kwargs) as writer:
             # --- כתיבת הטאב הראשי (רק אם יש נתונים) ---
-            if flattened:
-                df = pd.DataFrame(flattened)
+            if flattened is not None:
+                df = flattened
                 original_count = len(df)
 
                 if original_count == 0:
                     print("⚠️ No data in DataFrame to export.")
                 else:
                     # Deduplication and normalization logic
-                    # Step 1: Normalize key fields for smart comparison with bidirectional name unification
-                    if employee_names:
-                        # Unify names against master list using fuzzy matching
-                        df['unified_name'] = df['employee_name'].apply(
-                            lambda x: get_best_name_match(x, employee_names) if pd.notna(x) else x
-                        )
-                        # Use unified name for normalization
-                        df['norm_name'] = df['unified_name'].astype(str).str.strip().str.replace(r'[-"\']', ' ', regex=True).str.replace(
-                            r'\s+', ' ', regex=True).replace('None', 'UNKNOWN').replace('', 'UNKNOWN')
-                        # Update employee_name to unified name
-                        df['employee_name'] = df['unified_name']
-                        df = df.drop(columns=['unified_name'], errors='ignore')
-                    else:
-                        # Without master list - regular normalization
-                        df['norm_name'] = df['employee_name'].astype(str).str.strip().str.replace(r'[-"\']', ' ', regex=True).str.replace(
-                            r'\s+', ' ', regex=True).replace('None', 'UNKNOWN').replace('', 'UNKNOWN')
+                    # Step 1: Normalize key fields for smart comparison.
+                    # Names are already unified against the master list by validate_and_unify_data
+                    # (matched name or "**CHECK:" prefix), so no second fuzzy pass is needed.
+                    # normalize_name is cached, so each distinct name is normalized once.
+                    df['norm_name'] = df['employee_name'].astype(str).map(normalize_name).replace('None', 'UNKNOWN').replace('', 'UNKNOWN')
 
                     # Normalize employee IDs (convert None, '', and non-numeric values to NO_ID)
                     df['norm_id'] = df['employee_id'].fillna('NO_ID').replace('', 'NO_ID').astype(str)
                     df['norm_id'] = df['norm_id'].replace('None', 'NO_ID')
 
+                    # Few distinct names/IDs repeat over many rows: as categoricals, grouping, sorting and
+                    # comparisons work on integer codes (categories are sorted, so the order is unchanged)
+                    df['norm_name'] = df['norm_name'].astype('category')
+                    df['norm_id'] = df['norm_id'].astype('category')
+
                     # Step 2: Create quality score (completeness score)
                     df['has_id'] = (df['norm_id'] != 'NO_ID').astype(int)
 
                     hour_cols = ['total_presence_hours', 'total_approved_hours', 'total_payable_hours', 'overtime_hours',
                                  'vacation_days', 'sick_days']
-                    # Ensure all hour columns exist before counting
-                    for col in hour_cols:
-                        if col not in df.columns:
-                            df[col] = np.nan
+                    # Ensure all hour columns exist before counting (added in one step)
+                    missing_cols = [col for col in hour_cols if col not in df.columns]
+                    if missing_cols:
+                        df = df.assign(**{col: np.nan for col in missing_cols})
 
                     df['hour_count'] = df[hour_cols].notna().sum(axis=1)
 
-                    # Step 3: Sort by quality: best row first, worst last
-                    df = df.sort_values(
-                        by=['norm_name', 'has_id', 'hour_count'],
-                        ascending=[True, False, False]
-                    )
+                    # Step 3: Find the best row of each (name, id) group: highest quality score, first one on ties
+                    # (hash-based groupby instead of sorting the whole table)
+                    df['score'] = df['has_id'] * 1000 + df['hour_count']
+                    best_idx = df.groupby(['norm_name', 'norm_id'], sort=False, observed=True)['score'].idxmax()
 
                     # Step 4: Remove duplicates intelligently (extra safety - validated_results should already be deduplicated)
-                    deduped_df = df.drop_duplicates(subset=['norm_name', 'norm_id'], keep='first')
+                    # Only the remaining rows' sort keys are sorted, best row first, for the report order
+                    row_order = df.loc[np.sort(best_idx.to_numpy()), ['norm_name', 'has_id', 'hour_count']].sort_values(
+                        by=['norm_name', 'has_id', 'hour_count'],
+                        ascending=[True, False, False]
+                    ).index
 
-                    # Step 5: Clean up helper columns before export
-                    final_df = deduped_df.drop(columns=['norm_name', 'norm_id', 'has_id', 'hour_count'], errors='ignore')
+                    # Step 5: Select the kept rows and export columns (without the helper columns) in one take
+                    export_cols = [col for col in df.columns if col not in DEDUP_HELPER_COLS]
+                    final_df = df.loc[row_order, export_cols]
                     final_count = len(final_df)
 
                     # Export cleaned DataFrame to Excel
-                    final_df.to_excel(writer, sheet_name="All_Reports_Summary", index=False)
+                    _write_sheet(writer, final_df, "All_Reports_Summary")
 
                     print(f"✅ Excel summary exported: {out_path}")
                     if (original_count > final_count):
@@ -248,12 +229,11 @@ def export_summary_excel(all_results, employee_names=None, debug_issues=None):
                             f"ℹ️ Deduplication removed {original_count - final_count} duplicate records (Original: {original_count}, Final: {final_count}).")
             
             # --- כתיבת הטאב של הבעיות ---
-            if problem_reports:
-                print(f"📊 Found {len(problem_reports)} issues. Generating debug report...")
-                problem_df = pd.DataFrame(problem_reports)
-                # Reorder columns for clarity
-                problem_df = problem_df[["file", "employee_name", "issue"]]
-                problem_df.to_excel(writer, sheet_name="Problem_Report", index=False)
+            if problem_reports["file"]:
+                print(f"📊 Found {len(problem_reports['file'])} issues. Generating debug report...")
+                # Columns in PROBLEM_COLUMNS order for clarity
+                problem_df = pd.DataFrame(problem_reports, columns=list(PROBLEM_COLUMNS))
+                _write_sheet(writer, problem_df, "Problem_Report")
                 print(f"✅ Debug report added as 'Problem_Report' tab.")
             else:
                 print("ℹ️ No debug issues found to report.")
@@ -1,12 +1,27 @@
 import os
 import imaplib
-import email
 from email.header import decode_header
+from email.parser import BytesParser
+from functools import lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 import re  # *** התיקון כאן - הוספת הייבוא החסר ***
 from datetime import datetime, timedelta
 import json # <--- חדש: נוסף ייבוא
+import queue
+import threading
+import socket
+import atexit
+import time
+import argparse
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to the standard json module
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,202 +32,774 @@ APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
 DOWNLOAD_DIR = Path("downloads")
 DOWNLOAD_DIR.mkdir(exist_ok=True)
 
+FETCH_BATCH_SIZE = 50  # Messages per IMAP FETCH command (one network round trip per batch)
+FETCH_CONNECTIONS = 3  # Parallel IMAP connections for downloading (Gmail allows ~15 per account)
+IMAP_HOST = "imap.gmail.com"
+MAILBOX_LABEL = '"Timesheet Reports"'
+IDLE_TIMEOUT = 25 * 60  # Seconds per IDLE wait - servers may drop IDLE after ~30 min (RFC 2177)
+IDLE_RETRY_DELAY = 60  # Seconds to wait before reconnecting after a failed IDLE
+IDLE_REPLY_TIMEOUT = 30  # Seconds to wait for the server's reply to IDLE/DONE
+# Flags for writing attachments with raw os.write (O_BINARY: no newline translation on Windows)
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+# Files at least this large are dropped from the page cache after writing (Linux/POSIX only)
+PAGE_CACHE_DROP_BYTES = 16 << 20  # 16 MiB
+STRUCTURE_BATCH_SIZE = 1000  # Messages per BODYSTRUCTURE FETCH (small responses - usually the whole month at once)
+BODY_SNIPPET_CHARS = 2000  # Email body characters kept in an attachment's metadata
+WRITE_QUEUE_SIZE = 32  # Files waiting for the writer thread (bounds the memory held by queued payloads)
+# Full message content; BODY.PEEK[] (unlike RFC822) doesn't make the server set \Seen on every message
+MESSAGE_FETCH_ITEMS = "(BODY.PEEK[])"
+
+# BODYSTRUCTURE markers of a message that may produce a file: a text/plain part (saved as .txt
+# or used as metadata), a report extension, or an encoded (RFC 2047/2231) filename we can't read
+_USEFUL_STRUCTURE_RE = re.compile(rb'"?text"?\s+"?plain"?|\.pdf|\.xls|\.csv|=\?|\*"', re.IGNORECASE)
+_FETCH_NUM_RE = re.compile(rb'^(\d+) \(')
+_UID_RE = re.compile(rb'UID (\d+)')
+# Full-message parser (compat32 policy, as email.message_from_bytes), created once instead of per message
+_MESSAGE_PARSER = BytesParser()
+# Characters not allowed in file names - removed with str.translate (no regex engine per name)
+_FILENAME_UNSAFE_TRANS = str.maketrans("", "", '\\/*?:"<>|')
+
+# Highest message UID already handled by the incremental (--daemon) sync
+# (dot-file, so main.py doesn't treat it as a report)
+SYNC_STATE_FILE = DOWNLOAD_DIR / ".gmail_sync_state.json"
+
+# Cached IMAP connection (host, account, connection), reused across fetch_reports_from_gmail() calls
+_CONNECTION = None
+_CONNECTION_LOCK = threading.Lock()
+
+
+def _write_file(filepath, payload):
+    """
+    Write a file (decoded attachment, metadata, email body) with unbuffered os.write calls
+    on a raw file descriptor: open + one write + close, without a Python buffer/text layer.
+    The payload is already one bytes object, so it goes to the kernel in a single write
+    (looping only if the OS accepts part of it).
+    """
+    data = memoryview(payload)
+    fd = os.open(filepath, _WRITE_FLAGS, 0o666)
+    try:
+        written = 0
+        while written < len(data):
+            written += os.write(fd, data[written:])
+        if written >= PAGE_CACHE_DROP_BYTES and hasattr(os, "posix_fadvise"):
+            # Large attachments are written once and read once later - start writeback now and
+            # don't let them push more useful pages out of the page cache (only a hint, errors ignored)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+    finally:
+        os.close(fd)
+
+
+@lru_cache(maxsize=4096)
+def _decode_first_header_chunk(raw_value):
+    """
+    Decode the first chunk of a raw header value (as decode_header()[0]) to text.
+    Cached: Subject/From repeat heavily in the reports label (same senders, same report names).
+    """
+    value, encoding = decode_header(raw_value)[0]
+    if isinstance(value, bytes):
+        return value.decode(encoding or "utf-8", errors="ignore")
+    return str(value)
+
+
+def _decode_header_value(raw_value):
+    """Decode a header value; str values go through the cache (Header objects aren't hashable)."""
+    if isinstance(raw_value, str):
+        return _decode_first_header_chunk(raw_value)
+    return _decode_first_header_chunk.__wrapped__(raw_value)
+
+
+def _scan_parts(msg):
+    """
+    Walk the MIME tree once, depth-first with an explicit stack (same order as msg.walk(),
+    without a generator per nesting level), and classify the message on the way.
+    
+    Returns:
+        (parts, has_attachment, has_file_part) - parts are the non-multipart parts;
+        has_attachment: some part has an 'attachment' disposition (then the body isn't saved as .txt);
+        has_file_part: some part has an 'attachment'/'inline' disposition (may be saved as a file)
+    """
+    parts = []
+    has_attachment = has_file_part = False
+    stack = [msg]
+    while stack:
+        node = stack.pop()
+        disposition = node.get('Content-Disposition', '') or ''
+        has_attachment = has_attachment or disposition.startswith('attachment')
+        if node.is_multipart():
+            stack.extend(reversed(node.get_payload()))
+        if node.get_content_maintype() != "multipart":
+            parts.append(node)
+            has_file_part = has_file_part or disposition.startswith(('attachment', 'inline'))
+    return parts, has_attachment, has_file_part
+
+
+def _body_snippet(part, max_chars=BODY_SNIPPET_CHARS):
+    """
+    Return the first max_chars characters of a text part's body.
+    """
+    body_payload = part.get_payload(decode=True)
+    if not body_payload:
+        return ""
+    return body_payload.decode(part.get_content_charset() or "utf-8", errors="ignore")[:max_chars]
+
+
+def _unique_filepath(filename, taken_names, next_counters):
+    """
+    Return a path in DOWNLOAD_DIR that doesn't overwrite an existing file
+    (name, name_1, name_2, ...) and reserve it in taken_names.
+    taken_names is a set of os.path.normcase'd names, loaded once per run instead of a stat per attempt.
+    next_counters remembers where the search for each name stopped (names are only ever added,
+    so lower counters stay taken) - the same report name arriving again doesn't re-probe _1, _2, ...
+    """
+    filepath = DOWNLOAD_DIR / filename
+    key = os.path.normcase(filename)
+    if key in taken_names:
+        stem, suffix = Path(filename).stem, Path(filename).suffix
+        counter = next_counters.get(key, 1)
+        while os.path.normcase(f"{stem}_{counter}{suffix}") in taken_names:
+            counter += 1
+        filepath = DOWNLOAD_DIR / f"{stem}_{counter}{suffix}"
+        next_counters[key] = counter + 1
+    taken_names.add(os.path.normcase(filepath.name))
+    return filepath
+
+
+def _split_fetch_response(data):
+    """
+    Group an imaplib FETCH response by message.
+    A message starts with b'<num> (...'; literals come as (prefix, literal) tuples
+    followed by the rest of the line, which belong to the same message.
+    
+    Returns:
+        List of (uid, text, literals) - text is the response without literal contents
+    """
+    messages = []
+    for entry in data or []:
+        parts = entry if isinstance(entry, (tuple, list)) else (entry,)
+        head = parts[0] if parts and isinstance(parts[0], bytes) else b""
+        if _FETCH_NUM_RE.match(head) or not messages:
+            messages.append([b"", []])
+        messages[-1][0] += head
+        messages[-1][1].extend(part for part in parts[1:] if isinstance(part, bytes))
+
+    result = []
+    for text, literals in messages:
+        match = _UID_RE.search(text)
+        result.append((match.group(1) if match else None, text, literals))
+    return result
+
+
+def _uid_set(uids):
+    """
+    Build a compact IMAP UID set from a list of UIDs: runs of consecutive UIDs become
+    ranges (b"101:130,145"), so a FETCH command for many messages stays short.
+    """
+    ranges = []
+    start = prev = None
+    for uid in map(int, uids):
+        if prev is not None and uid == prev + 1:
+            prev = uid
+            continue
+        if start is not None:
+            ranges.append(f"{start}:{prev}" if prev != start else str(start))
+        start = prev = uid
+    if start is not None:
+        ranges.append(f"{start}:{prev}" if prev != start else str(start))
+    return ",".join(ranges).encode()
+
+
+def _filter_by_bodystructure(mail, message_uids):
+    """
+    Fetch only the BODYSTRUCTURE (MIME layout, no content) of message_uids and drop messages
+    that can't produce any file - no text/plain part and no PDF/Excel/CSV attachment -
+    so their full content is never downloaded.
+    Keeps every message whose structure couldn't be read.
+    """
+    structures = {}
+    for start in range(0, len(message_uids), STRUCTURE_BATCH_SIZE):
+        batch = message_uids[start:start + STRUCTURE_BATCH_SIZE]
+        try:
+            _, data = mail.uid("FETCH", _uid_set(batch), "(BODYSTRUCTURE)")
+        except Exception as e:
+            print(f"⚠️ Could not read message structure ({e}), downloading {len(batch)} messages in full.")
+            continue
+
+        for uid, text, literals in _split_fetch_response(data):
+            if uid is not None:
+                structures[uid] = b" ".join([text] + literals)
+
+    kept = [uid for uid in message_uids if uid not in structures or _USEFUL_STRUCTURE_RE.search(structures[uid])]
+    if len(kept) < len(message_uids):
+        print(f"ℹ️ Skipping {len(message_uids) - len(kept)} messages without a text body or report attachment.")
+    return kept
+
+
+def _open_mailbox():
+    """Open an IMAP connection to Gmail, log in and select the reports label."""
+    mail = imaplib.IMAP4_SSL(IMAP_HOST)
+    mail.login(EMAIL_ACCOUNT, APP_PASSWORD)
+    # Select the Gmail label instead of inbox
+    mail.select(MAILBOX_LABEL)
+    return mail
+
+
+def _logout_quietly(mail):
+    """Log out of an IMAP connection, ignoring errors (the connection may already be dead)."""
+    try:
+        mail.logout()
+    except Exception:
+        pass
+
+
+def get_connection():
+    """
+    Return a logged-in IMAP connection with the reports label selected.
+    The connection is kept open and reused by later calls, so each run doesn't pay a new
+    TLS handshake + LOGIN. A cached connection is checked with NOOP first and replaced
+    if it's dead or was opened for another host/account.
+    """
+    global _CONNECTION
+    with _CONNECTION_LOCK:
+        if _CONNECTION is not None:
+            host, account, mail = _CONNECTION
+            if (host, account) == (IMAP_HOST, EMAIL_ACCOUNT):
+                try:
+                    mail.noop()
+                    # Select again so the server reports the label's current state (UIDVALIDITY, new messages)
+                    mail.select(MAILBOX_LABEL)
+                    return mail
+                except (imaplib.IMAP4.error, OSError):
+                    pass
+            _logout_quietly(mail)
+            _CONNECTION = None
+
+        mail = _open_mailbox()
+        _CONNECTION = (IMAP_HOST, EMAIL_ACCOUNT, mail)
+        return mail
+
+
+def close_connection():
+    """Log out of the cached IMAP connection (called automatically on exit)."""
+    global _CONNECTION
+    with _CONNECTION_LOCK:
+        if _CONNECTION is not None:
+            _logout_quietly(_CONNECTION[2])
+            _CONNECTION = None
+
+
+atexit.register(close_connection)
+
+
+def _fetch_batch(mail, batch):
+    """
+    Fetch the full content of one batch of UIDs with a single UID FETCH command.
+    
+    Returns:
+        Dict {uid: raw_email} of the messages the server returned
+    """
+    try:
+        _, msg_data = mail.uid("FETCH", _uid_set(batch), MESSAGE_FETCH_ITEMS)
+    except Exception as e:
+        # If the batch fails, fall back to fetching its messages one by one
+        print(f"⚠️ Batch fetch failed ({e}), fetching {len(batch)} messages one by one.")
+        msg_data = []
+        for uid in batch:
+            try:
+                msg_data.extend(mail.uid("FETCH", uid, MESSAGE_FETCH_ITEMS)[1] or [])
+            except Exception as e_one:
+                print(f"❌ Error fetching message {uid.decode()}: {e_one}")
+
+    # Each message comes back as (b'<num> (UID <uid> BODY[] {size}', raw_bytes), followed by b')'
+    raw_by_uid = {}
+    for uid, _, literals in _split_fetch_response(msg_data):
+        if uid is not None and literals:
+            raw_by_uid[uid] = literals[0]
+    return raw_by_uid
+
+
+def _fetch_raw_messages(mail, message_uids, batch_size=FETCH_BATCH_SIZE, connections=FETCH_CONNECTIONS):
+    """
+    Fetch the full content of message_uids with one UID FETCH command per batch
+    instead of one round trip per message.
+    Batches are downloaded in parallel over up to `connections` IMAP connections (mail plus
+    extra ones opened on demand - an IMAP connection can't be shared between threads), while
+    the caller processes the batches already downloaded. At most `connections` batches are in flight.
+    Yields (uid, raw_email) in the order of message_uids; raw_email is None if no data was returned.
+    Each raw message is dropped from the batch as it's yielded, so only messages not processed yet stay in memory.
+    """
+    batches = [message_uids[start:start + batch_size] for start in range(0, len(message_uids), batch_size)]
+    if connections <= 1 or len(batches) <= 1:
+        for batch in batches:
+            raw_by_uid = _fetch_batch(mail, batch)
+            for uid in batch:
+                yield uid, raw_by_uid.pop(uid, None)
+        return
+
+    # Idle connections - each worker takes one, fetches its batch and returns it
+    idle_connections = queue.Queue()
+    idle_connections.put(mail)
+    extra_connections = []
+
+    def fetch(batch):
+        try:
+            conn = idle_connections.get_nowait()
+        except queue.Empty:
+            try:
+                conn = _open_mailbox()
+                extra_connections.append(conn)
+            except Exception as e:
+                print(f"⚠️ Could not open another IMAP connection ({e}), waiting for a free one.")
+                conn = idle_connections.get()
+        try:
+            return _fetch_batch(conn, batch)
+        finally:
+            idle_connections.put(conn)
+
+    pending_batches = iter(batches)
+    try:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            in_flight = deque((batch, executor.submit(fetch, batch)) for batch in islice(pending_batches, connections))
+            while in_flight:
+                batch, future = in_flight.popleft()
+                raw_by_uid = future.result()
+                next_batch = next(pending_batches, None)
+                if next_batch is not None:
+                    in_flight.append((next_batch, executor.submit(fetch, next_batch)))
+                for uid in batch:
+                    yield uid, raw_by_uid.pop(uid, None)
+    finally:
+        for conn in extra_connections:
+            _logout_quietly(conn)
+
+
+def _wait_for_new_mail(mail, timeout=IDLE_TIMEOUT):
+    """
+    Wait with IMAP IDLE (RFC 2177) until the server announces new messages in the selected
+    label (untagged EXISTS) or `timeout` seconds pass.
+    Uses imaplib's IMAP4.idle() on Python 3.14+. Older imaplib has no IDLE command, so the
+    command is sent with imaplib's own tag and the replies are read with its buffered line reader
+    (a reader thread, so every wait has a deadline); the connection is shut down if the server
+    stops answering, and the caller reconnects.
+    
+    Returns:
+        True if new mail was announced, False on timeout
+    """
+    if hasattr(mail, "idle"):
+        with mail.idle(duration=timeout) as idler:
+            for response_type, _ in idler:
+                if response_type == "EXISTS":
+                    return True
+        return False
+
+    tag = mail._new_tag()
+    lines = queue.Queue()
+
+    def reader():
+        # Reads up to (and including) the tagged completion of IDLE
+        try:
+            while True:
+                line = mail._get_line()
+                lines.put(line)
+                if line.startswith(tag):
+                    return
+        except Exception as e:
+            lines.put(e)
+
+    def next_line(deadline):
+        try:
+            line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            return None
+        if isinstance(line, Exception):
+            raise imaplib.IMAP4.abort(f"connection failed during IDLE: {line}")
+        return line
+
+    def reply_line(deadline, waiting_for):
+        line = next_line(deadline)
+        if line is None:
+            # The connection can't be reused: shut the socket down first (a blocked read can't be
+            # interrupted by closing imaplib's file), so the reader thread gets EOF and stops
+            try:
+                mail.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            raise imaplib.IMAP4.abort(f"no reply to {waiting_for} within {IDLE_REPLY_TIMEOUT} seconds")
+        return line
+
+    mail.send(tag + b" IDLE\r\n")
+    threading.Thread(target=reader, daemon=True).start()
+
+    new_mail = False
+    reply_deadline = time.monotonic() + IDLE_REPLY_TIMEOUT
+    response = reply_line(reply_deadline, "IDLE")
+    while response.startswith(b"* "):  # Untagged updates may arrive before the continuation
+        new_mail = new_mail or response.endswith(b" EXISTS")
+        response = reply_line(reply_deadline, "IDLE")
+    if not response.startswith(b"+"):
+        # Tagged NO/BAD - the reader thread has stopped, the connection is still in sync
+        mail.tagged_commands.pop(tag, None)  # Registered by _new_tag, never collected by imaplib
+        raise imaplib.IMAP4.error(f"IDLE not accepted: {response.decode(errors='replace')}")
+
+    deadline = time.monotonic() + timeout
+    while not new_mail:
+        line = next_line(deadline)
+        if line is None:
+            break
+        new_mail = line.startswith(b"* ") and line.endswith(b" EXISTS")
+
+    # End IDLE and read up to its tagged completion (the reader thread stops there)
+    mail.send(b"DONE\r\n")
+    reply_deadline = time.monotonic() + IDLE_REPLY_TIMEOUT
+    while not response.startswith(tag):
+        response = reply_line(reply_deadline, "DONE")
+    mail.tagged_commands.pop(tag, None)  # Registered by _new_tag, never collected by imaplib
+    return new_mail
+
+
+def _newest_unsynced_uid(mail):
+    """
+    Highest UID in the label (within the current month, like the fetch) above the last one the
+    incremental sync handled, or 0 if there is none. Messages that arrive during a fetch are only
+    announced in replies imaplib doesn't keep, so IDLE alone wouldn't report them.
+    """
+    uidvalidity_data = mail.response("UIDVALIDITY")[1]
+    uidvalidity = uidvalidity_data[0].decode() if uidvalidity_data and uidvalidity_data[0] else None
+    sync_state = _load_sync_state()
+    last_uid = 0
+    if uidvalidity is not None and sync_state.get("uidvalidity") == uidvalidity:
+        last_uid = int(sync_state.get("last_uid") or 0)
+    search_start_str, search_end_str = _current_month_range()
+    status, messages = mail.uid(
+        "SEARCH", None, f'(UID {last_uid + 1}:* SINCE "{search_start_str}" BEFORE "{search_end_str}")'
+    )
+    if status != "OK":
+        return 0
+    # "<last+1>:*" always matches the newest message, even if it was already handled
+    return max((int(uid) for uid in messages[0].split() if int(uid) > last_uid), default=0)
+
+
+def run_daemon(idle_timeout=IDLE_TIMEOUT):
+    """
+    Keep the fetcher running: fetch the new reports, then wait on IMAP IDLE over the same
+    cached connection until Gmail announces new messages (or idle_timeout passes) and fetch
+    again - only the new UIDs, thanks to the incremental sync. Stop with Ctrl+C.
+    """
+    print("👂 Watching Gmail for new reports (Ctrl+C to stop)...")
+    pending_uid = 0  # Newest unsynced UID found before the last fetch
+    try:
+        while True:
+            fetch_reports_from_gmail(incremental=True)
+            try:
+                mail = get_connection()
+                # Mail that arrived during the fetch: fetch again instead of waiting for the next
+                # change (but only once per UID, so a fetch that keeps failing doesn't spin)
+                newest_uid = _newest_unsynced_uid(mail)
+                if newest_uid and newest_uid != pending_uid:
+                    pending_uid = newest_uid
+                    print("📬 New messages arrived during the last fetch.")
+                    continue
+                if _wait_for_new_mail(mail, idle_timeout):
+                    print("📬 New messages in label.")
+            except (imaplib.IMAP4.error, OSError) as e:
+                print(f"⚠️ IDLE failed ({e}), reconnecting in {IDLE_RETRY_DELAY} seconds...")
+                close_connection()
+                time.sleep(IDLE_RETRY_DELAY)
+    except KeyboardInterrupt:
+        print("👋 Stopped watching Gmail.")
+    finally:
+        close_connection()
+
+
+def _writer_loop(write_queue, failed_uids):
+    """
+    Write-behind writer: writes the files queued by the download loop in a background thread,
+    so disk writes overlap with fetching and parsing the next messages.
+    Items are (uid, filepath, data, description, item_after) - str data is written UTF-8 encoded;
+    item_after (e.g. an attachment's metadata) is written only if this write succeeded.
+    The UID of every message with a failed write is added to failed_uids.
+    None stops the loop.
+    """
+    for item in iter(write_queue.get, None):
+        while item is not None:
+            uid, filepath, data, description, item_after = item
+            try:
+                _write_file(filepath, data.encode("utf-8") if isinstance(data, str) else data)
+                print(f"✅ Saved {description}: {filepath.name}")
+            except Exception as e:
+                print(f"❌ Error writing {description} file {filepath.name}: {e}")
+                failed_uids.add(uid)
+                break
+            item = item_after
+
 
-def fetch_reports_from_gmail():
-    """Fetches attachments (PDF, XLSX, CSV) from Gmail inbox"""
+def _load_sync_state():
+    """
+    Read the incremental sync state ({"uidvalidity", "last_uid", "retry_uids"}); empty dict if missing/corrupt.
+    retry_uids are messages up to last_uid that weren't fully handled (fetch/parse error or failed write).
+    """
     try:
-        mail = imaplib.IMAP4_SSL("imap.gmail.com")
+        return json.loads(SYNC_STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
 
-        # Calculate date range (current month) for IMAP search filtering
-        today = datetime.now()
-        first_day_current_month = today.replace(day=1)
-        first_day_next_month = (first_day_current_month + timedelta(days=32)).replace(day=1)
 
-        search_start_str = first_day_current_month.strftime("%d-%b-%Y")
-        search_end_str = first_day_next_month.strftime("%d-%b-%Y")
+def _save_sync_state(uidvalidity, last_uid, retry_uids):
+    """Remember the highest UID seen and the ones to retry, so the next run only searches those and newer messages."""
+    state = {"uidvalidity": uidvalidity, "last_uid": last_uid, "retry_uids": retry_uids}
+    try:
+        SYNC_STATE_FILE.write_text(json.dumps(state), encoding="utf-8")
+    except OSError as e:
+        print(f"⚠️ Could not save Gmail sync state: {e}")
+
+
+def _current_month_range():
+    """IMAP SEARCH dates (DD-Mon-YYYY) of the current month: (first day, first day of next month)."""
+    today = datetime.now()
+    first_day_current_month = today.replace(day=1)
+    first_day_next_month = (first_day_current_month + timedelta(days=32)).replace(day=1)
+    return first_day_current_month.strftime("%d-%b-%Y"), first_day_next_month.strftime("%d-%b-%Y")
+
+
+def fetch_reports_from_gmail(incremental=False):
+    """
+    Fetches attachments (PDF, XLSX, CSV) from Gmail inbox.
+    
+    Args:
+        incremental: Only fetch messages newer than the last fully handled UID (used by the
+            --daemon mode). By default the whole current month is fetched, since main.py
+            builds the monthly summary from the downloaded files only.
+    """
+    try:
+        # Calculate date range (current month) for IMAP search filtering
+        search_start_str, search_end_str = _current_month_range()
         search_query = f'(SINCE "{search_start_str}" BEFORE "{search_end_str}")'
 
-        mail.login(EMAIL_ACCOUNT, APP_PASSWORD)
-        # Select the Gmail label instead of inbox
-        mail.select('"Timesheet Reports"')
+        mail = get_connection()
         print(f"🔍 Searching for messages from {search_start_str} to before {search_end_str}...")
 
+        # Incremental sync: only messages with a UID above the last handled one
+        # (UIDs stay valid as long as the label's UIDVALIDITY doesn't change)
+        uidvalidity = None
+        last_uid = 0
+        retry_uids = set()
+        if incremental:
+            uidvalidity_data = mail.response("UIDVALIDITY")[1]
+            uidvalidity = uidvalidity_data[0].decode() if uidvalidity_data and uidvalidity_data[0] else None
+            sync_state = _load_sync_state()
+            if uidvalidity is not None and sync_state.get("uidvalidity") == uidvalidity:
+                last_uid = int(sync_state.get("last_uid") or 0)
+                retry_uids = {int(uid) for uid in sync_state.get("retry_uids") or []}
+        if last_uid:
+            # Messages that failed last time are searched again together with the new ones
+            uid_set = _uid_set(sorted(retry_uids)).decode()
+            uid_set = f"{uid_set},{last_uid + 1}:*" if uid_set else f"{last_uid + 1}:*"
+            search_query = f'(UID {uid_set} SINCE "{search_start_str}" BEFORE "{search_end_str}")'
+
         # ---
         # שונה מ-'NOT DELETED' ל-'ALL' כדי לכלול את כל המיילים בתווית
-        status, messages = mail.search(None, search_query)
+        status, messages = mail.uid("SEARCH", None, search_query)
         # ---
 
         if status != "OK":
             print("❌ No messages found.")
             return
 
-        message_ids = messages[0].split()
-        print(f"🔍 Found {len(message_ids)} messages in label.")
-
-        for num in message_ids:
-            # הוספת בדיקה למקרה שמספר ההודעה ריק
-            if not num:
-                continue
-
-            try:
-                _, msg_data = mail.fetch(num, "(RFC822)")
-                # הוספת בדיקה למקרה ש-msg_data ריק או בפורמט לא צפוי
-                if not msg_data or not msg_data[0] or not isinstance(msg_data[0], (tuple, list)) or len(
-                        msg_data[0]) < 2:
-                    print(f"⚠️ Skipping message {num}: Invalid data structure.")
-                    continue
-
-                raw_email = msg_data[0][1]
-                if not raw_email:
-                    print(f"⚠️ Skipping message {num}: Empty email body.")
-                    continue
+        # "<last+1>:*" always matches the newest message, even if it was already handled
+        message_ids = [uid for uid in messages[0].split() if uid and (int(uid) > last_uid or int(uid) in retry_uids)]
+        if last_uid:
+            print(f"🔍 Found {len(message_ids)} new messages in label (after UID {last_uid}, incl. retries).")
+        else:
+            print(f"🔍 Found {len(message_ids)} messages in label.")
+
+        # Names already in the downloads folder (read once) - new files get a free name from this set
+        with os.scandir(DOWNLOAD_DIR) as entries:
+            taken_names = {os.path.normcase(entry.name) for entry in entries}
+        next_counters = {}
+
+        # Files are written by a background thread while the next messages are downloaded
+        write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        failed_uids = set()  # Messages with a failed write (filled by the writer thread)
+        handled_uids = set()  # Messages downloaded and parsed without errors
+        writer = threading.Thread(target=_writer_loop, args=(write_queue, failed_uids), daemon=True)
+        writer.start()
+
+        # Download in full only messages whose structure shows something to save.
+        # The incremental sync downloads every new message (only a few per wake-up), so the
+        # sync mark only moves past messages that were actually parsed and written.
+        to_download = message_ids if incremental else _filter_by_bodystructure(mail, message_ids)
+
+        try:
+            for num, raw_email in _fetch_raw_messages(mail, to_download):
+                try:
+                    # הוספת בדיקה למקרה שהשרת לא החזיר נתונים להודעה
+                    if raw_email is None:
+                        print(f"⚠️ Skipping message {num}: Invalid data structure.")
+                        continue
 
-                msg = email.message_from_bytes(raw_email)
-
-                # --- חדש: חילוץ נושא, שולח, וגוף המייל ---
-                subject = "No Subject"
-                if msg["Subject"]:
-                    subject_header = decode_header(msg["Subject"])[0]
-                    if isinstance(subject_header[0], bytes):
-                        subject = subject_header[0].decode(subject_header[1] or "utf-8", errors="ignore")
-                    else:
-                        subject = str(subject_header[0])
-                
-                from_ = "No Sender"
-                if msg["From"]:
-                    from_header = decode_header(msg["From"])[0]
-                    if isinstance(from_header[0], bytes):
-                        from_ = from_header[0].decode(from_header[1] or "utf-8", errors="ignore")
-                    else:
-                        from_ = str(from_header[0])
-
-                email_body_text = ""
-                # --- סוף קטע חדש ---
-
-
-                # המרת ID ל-string לצורך הדפסה בטוחה
-                msg_id_str = num.decode() if isinstance(num, bytes) else str(num)
-                print(f"📩 Processing email: {subject} (ID: {msg_id_str})")
-
-                body_text_part = None
-
-                for part in msg.walk():
-                    if part.get_content_maintype() == "multipart":
+                    if not raw_email:
+                        print(f"⚠️ Skipping message {num}: Empty email body.")
+                        handled_uids.add(int(num))
                         continue
 
-                    disposition = part.get('Content-Disposition', '') or ''
-                    is_attachment = disposition.startswith(('attachment', 'inline'))
+                    msg = _MESSAGE_PARSER.parsebytes(raw_email)
+                    # The parsed message holds its own copy - release the raw bytes before decoding attachments
+                    raw_email = None
+
+                    # --- חדש: חילוץ נושא, שולח, וגוף המייל ---
+                    subject = "No Subject"
+                    raw_subject = msg["Subject"]
+                    if raw_subject:
+                        subject = _decode_header_value(raw_subject)
                     
-                    # --- חדש: חילוץ גוף המייל (גם אם יש קובץ מצורף) ---
-                    if not is_attachment and part.get_content_type() == "text/plain":
-                        if not email_body_text: # חלץ רק את החלק הראשון (העיקרי)
-                            try:
-                                body_payload = part.get_payload(decode=True)
-                                if body_payload:
-                                    email_body_text = body_payload.decode(part.get_content_charset() or "utf-8", errors="ignore")
-                            except Exception:
-                                pass # התעלם משגיאות בחילוץ גוף המייל
+                    from_ = "No Sender"
+                    raw_from = msg["From"]
+                    if raw_from:
+                        from_ = _decode_header_value(raw_from)
+
+                    email_body_text = ""
                     # --- סוף קטע חדש ---
 
-                    if is_attachment:
-                        filename = part.get_filename()
-                        if not filename:
-                            continue
 
-                        decoded_filename, enc = decode_header(filename)[0]
-                        if isinstance(decoded_filename, bytes):
-                            decoded_filename = decoded_filename.decode(enc or "utf-8", errors="ignore")
+                    # המרת ID ל-string לצורך הדפסה בטוחה
+                    msg_id_str = num.decode() if isinstance(num, bytes) else str(num)
+                    print(f"📩 Processing email: {subject} (ID: {msg_id_str})")
 
-                        decoded_filename = re.sub(r'[\\/*?:"<>|]', "", decoded_filename)
+                    # Name stem of the body .txt file - computed once per message, not per text part
+                    sanitized_subject = subject.translate(_FILENAME_UNSAFE_TRANS) or "EmailBody"
 
-                        if not decoded_filename:
-                            print("⚠️ Found attachment with invalid/empty filename, skipping.")
-                            continue
+                    body_text_part = None
 
-                        if decoded_filename.lower().endswith((".pdf", ".xlsx", ".csv", ".xls")):
-                            filepath = DOWNLOAD_DIR / decoded_filename
+                    # One pass over the MIME tree: whether the message has an attachment (the body is
+                    # saved as .txt only when it has none) is decided here, not again for every text part
+                    parts, has_attachment, has_file_part = _scan_parts(msg)
 
-                            counter = 1
-                            original_filepath = filepath
-                            while filepath.exists():
-                                filepath = DOWNLOAD_DIR / f"{original_filepath.stem}_{counter}{original_filepath.suffix}"
-                                counter += 1
+                    for part in parts:
+                        disposition = part.get('Content-Disposition', '') or ''
+                        is_attachment = disposition.startswith(('attachment', 'inline'))
+                        
+                        # Decoded (base64/QP) content of a text/plain part - decoded once,
+                        # used both for the metadata body snippet and for the .txt body file
+                        body_payload = None
 
+                        # --- חדש: חילוץ גוף המייל (גם אם יש קובץ מצורף) ---
+                        if not is_attachment and part.get_content_type() == "text/plain":
                             try:
-                                # שמירת הקובץ המצורף
-                                with open(filepath, "wb") as f:
-                                    f.write(part.get_payload(decode=True))
-                                print(f"✅ Saved attachment: {filepath.name}")
+                                if has_attachment:
+                                    # The body isn't saved as .txt - only the metadata snippet is needed
+                                    if not email_body_text: # חלץ רק את החלק הראשון (העיקרי)
+                                        email_body_text = _body_snippet(part)
+                                else:
+                                    body_payload = part.get_payload(decode=True)
+                                    if not email_body_text and body_payload: # חלץ רק את החלק הראשון (העיקרי)
+                                        email_body_text = body_payload.decode(part.get_content_charset() or "utf-8", errors="ignore")
+                            except Exception:
+                                pass # התעלם משגיאות בחילוץ גוף המייל
+                        # --- סוף קטע חדש ---
+
+                        if is_attachment:
+                            filename = part.get_filename()
+                            if not filename:
+                                continue
+
+                            decoded_filename, enc = decode_header(filename)[0]
+                            if isinstance(decoded_filename, bytes):
+                                decoded_filename = decoded_filename.decode(enc or "utf-8", errors="ignore")
+
+                            decoded_filename = decoded_filename.translate(_FILENAME_UNSAFE_TRANS)
+
+                            if not decoded_filename:
+                                print("⚠️ Found attachment with invalid/empty filename, skipping.")
+                                continue
+
+                            if decoded_filename.lower().endswith((".pdf", ".xlsx", ".csv", ".xls")):
+                                filepath = _unique_filepath(decoded_filename, taken_names, next_counters)
 
                                 # --- חדש: שמירת קובץ מטא-דאטה נלווה ---
                                 meta_filepath = filepath.with_suffix(filepath.suffix + '.meta.json')
                                 meta_data = {
                                     "subject": subject,
                                     "from": from_,
-                                    "body_snippet": email_body_text[:2000] # שמירת 2000 התווים הראשונים של גוף המייל
+                                    "body_snippet": email_body_text[:BODY_SNIPPET_CHARS] # שמירת 2000 התווים הראשונים של גוף המייל
                                 }
                                 try:
-                                    with open(meta_filepath, "w", encoding="utf-8") as meta_f:
-                                        json.dump(meta_data, meta_f, ensure_ascii=False, indent=4)
-                                    print(f"✅ Saved metadata: {meta_filepath.name}")
+                                    if orjson:
+                                        # Serialized in C straight to UTF-8 bytes, written in one call
+                                        meta_content = orjson.dumps(meta_data, option=orjson.OPT_INDENT_2)
+                                    else:
+                                        meta_content = json.dumps(meta_data, ensure_ascii=False, indent=2)
+                                    meta_item = (num, meta_filepath, meta_content, "metadata", None)
                                 except Exception as e_meta:
                                     print(f"❌ Error writing metadata file {meta_filepath.name}: {e_meta}")
+                                    meta_item = None
                                 # --- סוף קטע חדש ---
 
-                            except IOError as e:
-                                print(f"❌ Error writing file {filepath.name}: {e}")
-                        
-                        # --- שונה: הלוגיקה של שמירת גוף המייל כ-TXT הועברה ---
-                        # (הלוגיקה הישנה ששמרה גוף מייל כ-TXT נמחקה מכאן
-                        # מכיוון שאנו תמיד מחפשים קבצים מצורפים,
-                        # וגוף המייל נשמר עכשיו בקובץ ה-JSON)
-                        # ...
-
-                    # --- חדש: שמירת גוף המייל כ-TXT רק אם *אין* קבצים מצורפים ---
-                    elif part.get_content_type() == "text/plain" and not any(p.get('Content-Disposition', '').startswith('attachment') for p in msg.walk()):
-                        if body_text_part: # אם כבר שמרנו גוף מייל
-                            continue
-
-                        body_payload = part.get_payload(decode=True)
-                        if not body_payload:
-                            continue
-
-                        body_text = body_payload.decode(part.get_content_charset() or "utf-8", errors="ignore")
-
-                        if body_text and body_text.strip():
-                            sanitized_subject = re.sub(r'[\\/*?:"<>|]', "", subject)
-                            if not sanitized_subject:
-                                sanitized_subject = "EmailBody"
-                            msg_id_str = num.decode() if isinstance(num, bytes) else str(num)
-
-                            filename = f"{sanitized_subject}_Body_{msg_id_str}.txt"
-                            filepath = DOWNLOAD_DIR / filename
-
-                            counter = 1
-                            original_filepath = filepath
-                            while filepath.exists():
-                                filepath = DOWNLOAD_DIR / f"{original_filepath.stem}_{counter}{original_filepath.suffix}"
-                                counter += 1
+                                # שמירת הקובץ המצורף (ואחריו המטא-דאטה) - נכתבים ברקע ע"י ה-writer thread
+                                write_queue.put((num, filepath, part.get_payload(decode=True), "attachment", meta_item))
+                            
+                            # --- שונה: הלוגיקה של שמירת גוף המייל כ-TXT הועברה ---
+                            # (הלוגיקה הישנה ששמרה גוף מייל כ-TXT נמחקה מכאן
+                            # מכיוון שאנו תמיד מחפשים קבצים מצורפים,
+                            # וגוף המייל נשמר עכשיו בקובץ ה-JSON)
+                            # ...
 
-                            try:
-                                with open(filepath, "w", encoding="utf-8") as f:
-                                    f.write(body_text)
-                                print(f"✅ Saved email body (as .txt): {filepath.name}")
-                                body_text_part = body_text # סמן ששמרנו
-                            except IOError as e:
-                                print(f"❌ Error writing email body file {filepath.name}: {e}")
-                    # --- סוף קטע חדש ---
+                        # --- חדש: שמירת גוף המייל כ-TXT רק אם *אין* קבצים מצורפים ---
+                        elif part.get_content_type() == "text/plain" and not has_attachment:
+                            if body_text_part: # אם כבר שמרנו גוף מייל
+                                continue
 
-            except Exception as e:
-                msg_id_str = num.decode() if isinstance(num, bytes) else str(num)
-                print(f"❌ Error processing message {msg_id_str}: {e}")
+                            if not body_payload:
+                                continue
+
+                            body_text = body_payload.decode(part.get_content_charset() or "utf-8", errors="ignore")
+
+                            if body_text and body_text.strip():
+                                filename = f"{sanitized_subject}_Body_{msg_id_str}.txt"
+                                filepath = _unique_filepath(filename, taken_names, next_counters)
+
+                                write_queue.put((num, filepath, body_text, "email body (as .txt)", None))
+                                body_text_part = body_text # סמן ששמרנו
+                                if not has_file_part:
+                                    break # No file parts left to save - the rest of the message isn't needed
+                        # --- סוף קטע חדש ---
+
+                    handled_uids.add(int(num))
+
+                except Exception as e:
+                    msg_id_str = num.decode() if isinstance(num, bytes) else str(num)
+                    print(f"❌ Error processing message {msg_id_str}: {e}")
+        finally:
+            # Wait for all queued files to be written
+            write_queue.put(None)
+            writer.join()
+
+        if incremental and uidvalidity is not None and message_ids:
+            # Messages that weren't fully handled (fetch/parse error, failed write) are retried next time
+            done_uids = handled_uids - {int(uid) for uid in failed_uids}
+            seen_uids = [int(uid) for uid in message_ids]
+            _save_sync_state(uidvalidity, max([last_uid] + seen_uids),
+                             sorted(uid for uid in seen_uids if uid not in done_uids))
 
-        mail.logout()
         print("📥 All attachments downloaded successfully!")
 
     except Exception as e:
         print("❌ Error fetching reports:", e)
+        # Don't reuse a connection that may be in an unknown state - the next call reconnects
+        close_connection()
 
 
 if __name__ == "__main__":
-    fetch_reports_from_gmail()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download timesheet reports from Gmail")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and download new reports as they arrive (IMAP IDLE)"
+    )
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon()
+    else:
+        fetch_reports_from_gmail()
\ No newline at end of file
@@ -10,7 +10,16 @@ from google.oauth2.service_account import Credentials
 from gspread.exceptions import WorksheetNotFound
 import re
 import difflib
+import unicodedata
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    # data_validator already prints the install hint; fall back to difflib
+    RAPIDFUZZ_AVAILABLE = False
 
 # --- שונה: ייבוא הרשימה המרכזית ---
 try:
@@ -22,8 +31,8 @@ except ImportError:
 
 from data_validator import (
     load_master_data, 
-    get_master_employee_dict, 
     match_employee_name, 
+    match_employee_names,
     normalize_name
 )
 
@@ -36,31 +45,101 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive.file"
 ]
 
+# Fuzzy name match threshold for data_validator.match_employee_name (0-1 ratio)
+NAME_MATCH_THRESHOLD = 0.7
+
+# Fuzzy threshold for finding an employee's row in the monthly sheet (difflib ratio scale)
+SHEET_MATCH_THRESHOLD = 0.75
+
+# Name normalization for deduplication keys (compiled/built once, not per call)
+_PUNCT_TRANS = str.maketrans({'-': ' ', '"': ' ', "'": ' '})
+_WS_RE = re.compile(r'\s+')
+
+# Report period parsing (compiled once, not per result/period)
+_PERIOD_PUNCT_RE = re.compile(r'[\"\',]')  # Quotes and commas dropped from period names
+_QUOTES_RE = re.compile(r'["\']')
+_PERIOD_ENG_RE = re.compile(r'^([A-Za-z]+)\s+(\d{4})$')
+_PERIOD_HEB_RE = re.compile(r'^([\u0590-\u05FF"\'-]+)\s+(\d{4})$')
+_PERIOD_NUM_RE = re.compile(r'^(\d{4})[-/](\d{1,2})$')
+_ENG_MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+_HEB_MONTHS = {
+    'ינואר': 1, 'פברואר': 2, 'מרץ': 3, 'אפריל': 4, 'מאי': 5, 'יוני': 6,
+    'יולי': 7, 'אוגוסט': 8, 'ספטמבר': 9, 'אוקטובר': 10, 'נובמבר': 11, 'דצמבר': 12
+}
+
+# Helper columns added by deduplicate_results (not returned)
+DEDUP_HELPER_COLS = ("norm_name", "norm_id", "has_id", "hour_count", "score")
+
+# Top-level keys of a result item; every other column goes back into report_summary
+RESULT_ID_KEYS = ("file", "employee_name", "employee_id", "report_period")
+
 # Column titles in Hebrew
 TARGET_COLUMN_TITLE = "שעות בפועל"  # Actual hours column
 CALCULATED_COLUMN_TITLE = "שעות שבוצעו מתוך תקן (%)"  # Calculated percentage column
 
 
-def _fix_rtl_name(name: str) -> str:
+@lru_cache(maxsize=4096)
+def _dedup_key(name: str) -> str:
+    """
+    Deduplication key for a name: NFKC, strip, dashes/quotes to spaces, collapse whitespace.
+    Cached, so each distinct name is normalized once.
+    """
+    return _WS_RE.sub(' ', unicodedata.normalize('NFKC', name).strip().translate(_PUNCT_TRANS))
+
+
+def _name_key(value) -> str:
+    """
+    Deduplication name key for one cell: str() of the value through _dedup_key,
+    with missing/empty names ('None', '') grouped as UNKNOWN - one pass per row.
+    """
+    key = _dedup_key(str(value))
+    return 'UNKNOWN' if key in ('None', '') else key
+
+
+def _id_key(value) -> str:
     """
-    Simple RTL name fix - reverses name if it contains Hebrew characters.
+    Deduplication ID key for one cell: missing/empty IDs (None, NaN, '', 'None') become NO_ID.
+    """
+    if value is None or value == '' or pd.isna(value):
+        return 'NO_ID'
+    key = str(value)
+    return 'NO_ID' if key == 'None' else key
+
+
+def _map_distinct(values: pd.Series, func) -> pd.Series:
+    """
+    Apply func once per distinct value of a Series (pd.factorize + take) instead of once per row.
+    Missing values (None/NaN) are passed to func row by row, so each keeps its own result.
     
     Args:
-        name: Employee name string
+        values: Series to transform
+        func: Function applied to a single value
         
     Returns:
-        Reversed name if Hebrew detected, original name otherwise
+        Object Series of func results with the same index
     """
-    if not name or not isinstance(name, str):
-        return name
-    # If name contains Hebrew characters, reverse it
-    return name[::-1] if any('\u0590' <= c <= '\u05FF' for c in name) else name
+    codes, uniques = pd.factorize(values)
+    result = np.array([func(value) for value in uniques] + [None], dtype=object).take(codes)  # -1 (missing) -> None
+    missing = codes < 0
+    if missing.any():
+        result[missing] = [func(value) for value in values.to_numpy()[missing]]
+    return pd.Series(result, index=values.index)
+
+
+def _check_name(employee_name: str, matched_name) -> str:
+    """Matched master name, or the name flagged with "**CHECK:" if nothing reached the threshold."""
+    return matched_name if matched_name else f"**CHECK: {employee_name}"
 
 
 def get_best_name_match(employee_name: str, master_names: list) -> str:
     """
     Find best matching employee name from master list using fuzzy matching.
     Checks both original and reversed (RTL) name.
+    Scored by data_validator.match_employee_name, so names unify the same way in both modules
+    (matches against the central master list are cached there).
     
     Args:
         employee_name: Name to match
@@ -79,46 +158,37 @@ def get_best_name_match(employee_name: str, master_names: list) -> str:
             return f"**CHECK: {employee_name}" if employee_name else employee_name
         return employee_name
     
-    # Normalize employee name
-    name_norm = str(employee_name).strip()
-    name_norm = name_norm.replace('-', ' ').replace('"', ' ').replace("'", ' ')
-    name_norm = ' '.join(name_norm.split())
-    
-    # First check: original name
-    best_match = None
-    best_ratio = 0.0
+    matched_name, _ = match_employee_name(employee_name, master_names, NAME_MATCH_THRESHOLD)
+    return _check_name(employee_name, matched_name)
+
+
+def get_best_name_matches(employee_names: list, master_names: list) -> dict:
+    """
+    Match many names at once (same result as get_best_name_match per name).
+    All names are scored in one data_validator.match_employee_names batch
+    (a single multi-threaded rapidfuzz cdist call when available).
     
-    for master_name in master_names:
-        master_norm = str(master_name).strip()
-        master_norm = master_norm.replace('-', ' ').replace('"', ' ').replace("'", ' ')
-        master_norm = ' '.join(master_norm.split())
+    Args:
+        employee_names: Distinct names to match
+        master_names: List of master employee names
         
-        # Calculate similarity ratio using difflib
-        ratio = difflib.SequenceMatcher(None, name_norm.lower(), master_norm.lower()).ratio()
-        if ratio > best_ratio and ratio >= 0.7:
-            best_ratio = ratio
-            best_match = master_name
-    
-    # Second check: reversed name (RTL fix)
-    if not best_match:
-        name_reversed = _fix_rtl_name(name_norm)
-        if name_reversed != name_norm:  # Only if name changed after reversal
-            for master_name in master_names:
-                master_norm = str(master_name).strip()
-                master_norm = master_norm.replace('-', ' ').replace('"', ' ').replace("'", ' ')
-                master_norm = ' '.join(master_norm.split())
-                
-                ratio = difflib.SequenceMatcher(None, name_reversed.lower(), master_norm.lower()).ratio()
-                if ratio > best_ratio and ratio >= 0.7:
-                    best_ratio = ratio
-                    best_match = master_name
-    
-    # Return matched name from master list if found
-    if best_match:
-        return best_match
-    
-    # Add CHECK prefix if no match found
-    return f"**CHECK: {employee_name}"
+    Returns:
+        Dict of {employee_name: matched name or "**CHECK: {name}"}
+    """
+    matches = {}
+    names = []
+    for name in employee_names:
+        if name and not name.startswith("**CHECK:"):
+            names.append(name)
+        else:
+            matches[name] = name  # Empty or already flagged - returned as is
+    if not master_names or not names:
+        matches.update((n, get_best_name_match(n, master_names)) for n in names)
+        return matches
+
+    batch = match_employee_names(names, master_names, NAME_MATCH_THRESHOLD)
+    matches.update((name, _check_name(name, matched_name)) for name, (matched_name, _) in zip(names, batch))
+    return matches
 
 
 # --- Authentication ---
@@ -172,22 +242,26 @@ def deduplicate_results(all_results, employee_names=None):
     # Step 1: Normalize keys with name unification (bidirectional RTL fix)
     if employee_names:
         # --- חדש: תיקון כפילות CHECK ---
-        df['unified_name'] = df['employee_name'].apply(
-            lambda x: x if x and x.startswith("**CHECK:") else get_best_name_match(x, employee_names) if pd.notna(x) else x
-        )
+        # Match each distinct name once (one vectorized batch), then map every row through the lookup table
+        name_map = get_best_name_matches(list(df['employee_name'].dropna().unique()), employee_names)
+        df['unified_name'] = _map_distinct(df['employee_name'], lambda x: name_map.get(x, x))
         # --- סוף קטע חדש ---
         # Use unified name for normalization
-        df['norm_name'] = df['unified_name'].astype(str).str.strip().str.replace(r'[-"\']', ' ', regex=True).str.replace(
-            r'\s+', ' ', regex=True).replace('None', 'UNKNOWN').replace('', 'UNKNOWN')
+        df['norm_name'] = _map_distinct(df['unified_name'], _name_key)
         # Update employee_name to unified name
         df['employee_name'] = df['unified_name']
         df = df.drop(columns=['unified_name'], errors='ignore')
     else:
         # Without master list - regular normalization
-        df['norm_name'] = df['employee_name'].astype(str).str.strip().str.replace(r'[-"\']', ' ', regex=True).str.replace(
-            r'\s+', ' ', regex=True).replace('None', 'UNKNOWN').replace('', 'UNKNOWN')
-    df['norm_id'] = df['employee_id'].fillna('NO_ID').replace('', 'NO_ID').astype(str)
-    df['norm_id'] = df['norm_id'].replace('None', 'NO_ID')
+        df['norm_name'] = _map_distinct(df['employee_name'], _name_key)
+    # One pass per key column (no chained replace/astype traversals); names and IDs repeat
+    # across reports, so each distinct value is normalized once
+    df['norm_id'] = _map_distinct(df['employee_id'], _id_key)
+
+    # Few distinct names/IDs repeat over many rows: as categoricals, grouping and sorting
+    # work on integer codes (categories are sorted, so the order is unchanged)
+    df['norm_name'] = df['norm_name'].astype('category')
+    df['norm_id'] = df['norm_id'].astype('category')
 
     # 2. Create "quality score"
     df['has_id'] = (df['norm_id'] != 'NO_ID').astype(int)
@@ -200,34 +274,38 @@ def deduplicate_results(all_results, employee_names=None):
             df[col] = np.nan
     df['hour_count'] = df[hour_cols].notna().sum(axis=1)
 
-    # 3. Sort by quality
-    df = df.sort_values(
+    # 3. Best row of each (name, id) group: highest quality, first one on ties
+    # (hash-based groupby instead of sorting the whole table)
+    df['score'] = df['has_id'] * 1000 + df['hour_count']
+    best_idx = df.groupby(['norm_name', 'norm_id'], sort=False, observed=True)['score'].idxmax()
+
+    # 4. Smart deduplication - only the kept rows' sort keys are sorted by quality
+    row_order = df.loc[np.sort(best_idx.to_numpy()), ['norm_name', 'has_id', 'hour_count']].sort_values(
         by=['norm_name', 'has_id', 'hour_count'],
         ascending=[True, False, False]
-    )
+    ).index
 
-    # 4. Smart deduplication
-    deduped_df = df.drop_duplicates(subset=['norm_name', 'norm_id'], keep='first')
+    # 5. Select kept rows without the helper columns (one take) and return list of dicts
+    export_cols = [col for col in df.columns if col not in DEDUP_HELPER_COLS]
+    final_df = df.loc[row_order, export_cols]
 
-    # 5. Clean up helper columns and return list of dicts
-    final_df = deduped_df.drop(columns=['norm_name', 'norm_id', 'has_id', 'hour_count'], errors='ignore')
+    # Column-wise conversion to plain Python values (no Series per row as with iterrows);
+    # the missing-value mask for the summary columns is computed once for the whole table
+    summary_keys = [col for col in final_df.columns if col not in RESULT_ID_KEYS]
+    summary_values = final_df[summary_keys].to_numpy(dtype=object)
+    summary_present = final_df[summary_keys].notna().to_numpy()
+    id_values = [final_df[key].tolist() if key in final_df.columns else [None] * len(final_df)
+                 for key in RESULT_ID_KEYS]
 
     final_results = []
-    for _, row in final_df.iterrows():
-        result_item = {
-            "file": row.get('file'),
-            "employee_name": row.get('employee_name'),
-            "employee_id": row.get('employee_id'),
-            "report_period": row.get('report_period'),
-            "report_summary": {}
-        }
-
-        summary_keys = set(row.index) - {'file', 'employee_name', 'employee_id', 'report_period'}
-        for key in summary_keys:
-            if pd.notna(row[key]):
-                result_item["report_summary"][key] = row[key]
-
-        final_results.append(result_item)
+    for file, employee_name, employee_id, report_period, values, present in zip(*id_values, summary_values, summary_present):
+        final_results.append({
+            "file": file,
+            "employee_name": employee_name,
+            "employee_id": employee_id,
+            "report_period": report_period,
+            "report_summary": {key: value for key, value, keep in zip(summary_keys, values, present) if keep}
+        })
 
     return final_results
 
@@ -248,6 +326,27 @@ def col_to_letter(col_index):
     return letter
 
 
+def _column_ranges(col_letter, row_values):
+    """
+    Group single-column writes into contiguous A1 ranges for one batch_update call.
+    
+    Args:
+        col_letter: Column letter(s) in A1 notation
+        row_values: Dict of {row_number: value}
+        
+    Returns:
+        List of {'range': 'C2:C9', 'values': [[...], ...]} dicts, one per run of consecutive rows
+    """
+    data = []
+    for row in sorted(row_values):
+        if data and row == data[-1]['end'] + 1:
+            data[-1]['end'] = row
+            data[-1]['values'].append([row_values[row]])
+        else:
+            data.append({'start': row, 'end': row, 'values': [[row_values[row]]]})
+    return [{'range': f"{col_letter}{d['start']}:{col_letter}{d['end']}", 'values': d['values']} for d in data]
+
+
 def _parse_period_to_date(period_name: str):
     """
     Parse a period name like "October 2025" or "יוני 2023" into a datetime(year, month, 1).
@@ -257,37 +356,28 @@ def _parse_period_to_date(period_name: str):
         return None
     try:
         text = str(period_name).strip()
-        text = re.sub(r'["\']', '', text)
-
-        eng_months = {
-            'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
-            'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
-        }
-        heb_months = {
-            'ינואר': 1, 'פברואר': 2, 'מרץ': 3, 'אפריל': 4, 'מאי': 5, 'יוני': 6,
-            'יולי': 7, 'אוגוסט': 8, 'ספטמבר': 9, 'אוקטובר': 10, 'נובמבר': 11, 'דצמבר': 12
-        }
+        text = _QUOTES_RE.sub('', text)
 
         # Try English "Month YYYY"
-        m = re.match(r'^([A-Za-z]+)\s+(\d{4})$', text)
+        m = _PERIOD_ENG_RE.match(text)
         if m:
             month_name = m.group(1).lower()
             year = int(m.group(2))
-            month = eng_months.get(month_name)
+            month = _ENG_MONTHS.get(month_name)
             if month:
                 return datetime(year, month, 1)
 
         # Try Hebrew "<month> <year>"
-        m2 = re.match(r'^([\u0590-\u05FF"\'-]+)\s+(\d{4})$', text)
+        m2 = _PERIOD_HEB_RE.match(text)
         if m2:
             month_name_he = m2.group(1).replace('"', '').replace("'", '').strip()
             year = int(m2.group(2))
-            month = heb_months.get(month_name_he)
+            month = _HEB_MONTHS.get(month_name_he)
             if month:
                 return datetime(year, month, 1)
 
         # Fallback: try only year-month numeric like 2025-10 or 10/2025
-        m3 = re.match(r'^(\d{4})[-/](\d{1,2})$', text)
+        m3 = _PERIOD_NUM_RE.match(text)
         if m3:
             year = int(m3.group(1))
             month = int(m3.group(2))
@@ -326,7 +416,7 @@ def update_google_sheets(all_results, employee_names=None):
         period = res.get('report_period')
         if not period:
             continue
-        period = re.sub(r'[\"\',]', '', str(period)).strip()
+        period = _PERIOD_PUNCT_RE.sub('', str(period)).strip()
         if not period:
             continue
         results_by_period.setdefault(period, []).append(res)
@@ -342,7 +432,7 @@ def update_google_sheets(all_results, employee_names=None):
     # --- תיקון שם התקופה עבור הגשות מוקדמות ---
     corrected_results_by_period = {}
     for period, results in results_by_period.items():
-        period_clean = re.sub(r'[\"\',]', '', str(period)).strip()
+        period_clean = _PERIOD_PUNCT_RE.sub('', str(period)).strip()
         period_date = _parse_period_to_date(period_clean)
         
         final_period_name = period_clean
@@ -398,6 +488,9 @@ def update_google_sheets(all_results, employee_names=None):
             print("   - Ensure the master sheet is set up with columns in the first tab.")
             return
 
+        # Master data (standard hours, company) is loaded once for all periods
+        load_master_data() # עדיין נטען כדי לקבל שעות תקן וחברה
+
         # Iterate over each period and process independently with locking
         for report_period, period_results in results_by_period.items():
             # Locking: skip periods older than 2 months
@@ -434,15 +527,12 @@ def update_google_sheets(all_results, employee_names=None):
                 ]
                 # --- סוף קטע שונה ---
                 
-                monthly_ws.append_row(data_headers)
-
-                # Copy employee list from master
-                if master_employees_rows:
-                    monthly_ws.append_rows(master_employees_rows)
+                # Headers and employee list from master in one request
+                monthly_ws.append_rows([data_headers] + master_employees_rows)
                 print(f"   - Sheet '{period_clean}' created with {len(master_employees_rows)} employees.")
                 
-                # Add percentage formula to newly created sheet
-                current_headers = monthly_ws.get_all_values()[0]
+                # Add percentage formula to newly created sheet (headers are known - no read back)
+                current_headers = data_headers
                 current_col_map = {header.strip(): i + 1 for i, header in enumerate(current_headers)}
                 
                 # Assuming 'תקן שעות' (Standard Hours) is the 3rd column (index 2) in the master sheet
@@ -461,15 +551,16 @@ def update_google_sheets(all_results, employee_names=None):
                     num_employees = len(master_employees_rows)
                     
                     if num_employees > 0:
-                        formulas_to_send = []
+                        formulas_to_send = {}
                         
                         # Start from row 2 (after header)
                         for row_index in range(2, num_employees + 2):
                             # Formula: IFERROR(Actual Hours / Standard Hours, "")
-                            formula = f'=IFERROR({actual_letter}{row_index}/{standard_letter}{row_index}, "")'
-                            formulas_to_send.append(gspread.Cell(row_index, calculated_col, formula))
+                            formulas_to_send[row_index] = f'=IFERROR({actual_letter}{row_index}/{standard_letter}{row_index}, "")'
 
-                        monthly_ws.update_cells(formulas_to_send, value_input_option='USER_ENTERED')
+                        # One contiguous range for the whole column
+                        monthly_ws.batch_update(_column_ranges(col_to_letter(calculated_col), formulas_to_send),
+                                                value_input_option='USER_ENTERED')
                         print(f"   - Added percentage formula to {num_employees} rows.")
                     
             # Step 5: Map data for update with enhanced matching for this period
@@ -492,11 +583,6 @@ def update_google_sheets(all_results, employee_names=None):
                 print(f"❌ Cannot find target column '{TARGET_COLUMN_TITLE}' in data sheet. Check setup.")
                 continue
             
-            # --- שונה: שימוש ברשימה המרכזית ---
-            load_master_data() # עדיין נטען כדי לקבל שעות תקן וחברה
-            master_names_from_json = MASTER_EMPLOYEE_LIST
-            # --- סוף שינוי ---
-            
             # Build enhanced row map (employee_name -> row_number) with multiple variants
             # Maps both normalized names and original names for flexible matching
             row_map = {}
@@ -517,14 +603,34 @@ def update_google_sheets(all_results, employee_names=None):
                             if name_norm_lower not in row_map_variants:
                                 row_map_variants[name_norm_lower] = (employee_name, i)
                             # Also store with different normalizations
-                            name_alt = re.sub(r'[-"\']', ' ', employee_name).strip().lower()
+                            name_alt = employee_name.translate(_PUNCT_TRANS).strip().lower()
                             if name_alt and name_alt != name_norm_lower:
                                 if name_alt not in row_map_variants:
                                     row_map_variants[name_alt] = (employee_name, i)
             
             print(f"   - Built row map with {len(row_map)} exact matches and {len(row_map_variants)} normalized variants")
+            # Variant keys as a list for rapidfuzz (kept in sync when new rows are added below)
+            variant_keys = list(row_map_variants)
+            sheet_score_cutoff = SHEET_MATCH_THRESHOLD * 100
+            
+            # Strategy 2 scores against the sheet's variants for every name that misses an exact
+            # match, in one multi-threaded process.cdist call: {name key: (best variant index, score)}
+            initial_variant_count = len(variant_keys)
+            sheet_fuzzy_best = {}
+            if RAPIDFUZZ_AVAILABLE and variant_keys:
+                queries = list(dict.fromkeys(
+                    key for key in (normalize_name(r['employee_name']).lower() for r in clean_results if r.get('employee_name'))
+                    if key not in row_map_variants
+                ))
+                if queries:
+                    scores = process.cdist(queries, variant_keys, scorer=fuzz.ratio,
+                                           score_cutoff=sheet_score_cutoff, workers=-1)
+                    best_idx = scores.argmax(axis=1)  # First one on ties
+                    best_scores = scores[np.arange(len(queries)), best_idx]
+                    sheet_fuzzy_best = dict(zip(queries, zip(best_idx.tolist(), best_scores.tolist())))
             
             updates_to_send = []
+            pending_new_rows = []  # New employee rows, appended in one request after the loop
             unmatched_count = 0
             matched_count = 0
             
@@ -536,27 +642,43 @@ def update_google_sheets(all_results, employee_names=None):
                 row_num = None
                 
                 # Strategy 1: Try exact match first
+                # (normalized once per employee - reused by the fuzzy match below)
                 name_norm = normalize_name(name)
-                if name_norm:
-                    name_norm_lower = name_norm.lower()
-                    if name_norm_lower in row_map_variants:
-                        matched_name_in_sheet, row_num = row_map_variants[name_norm_lower]
-                        matched_count += 1
-                        # print(f"   ✅ Exact match: '{name}' -> '{matched_name_in_sheet}' (row {row_num})") # הפחתת רעש
+                name_norm_lower = name_norm.lower()
+                if name_norm and name_norm_lower in row_map_variants:
+                    matched_name_in_sheet, row_num = row_map_variants[name_norm_lower]
+                    matched_count += 1
+                    # print(f"   ✅ Exact match: '{name}' -> '{matched_name_in_sheet}' (row {row_num})") # הפחתת רעש
                 
                 # --- שונה: אסטרטגיה 2,3,4 (Fuzzy) מאוחדות ---
                 # Strategy 2: Fuzzy match against all names in row_map_variants
                 if not row_num:
                     best_match_in_sheet = None
                     best_ratio = 0.0
-                    name_norm_lower = normalize_name(name).lower()
                     
-                    for sheet_name_norm_lower, (sheet_name_original, sheet_row_num) in row_map_variants.items():
-                        ratio = difflib.SequenceMatcher(None, name_norm_lower, sheet_name_norm_lower).ratio()
-                        if ratio > best_ratio and ratio >= 0.75:
-                            best_ratio = ratio
-                            best_match_in_sheet = sheet_name_original
-                            row_num = sheet_row_num
+                    if RAPIDFUZZ_AVAILABLE:
+                        # Best of the sheet's own rows comes from the cdist batch above
+                        best = None
+                        if name_norm_lower in sheet_fuzzy_best:
+                            best_index, best_score = sheet_fuzzy_best[name_norm_lower]
+                            if best_score >= sheet_score_cutoff:
+                                best = (variant_keys[best_index], best_score)
+                        # Rows added during this loop are scanned separately (earlier rows win ties)
+                        if len(variant_keys) > initial_variant_count:
+                            added = process.extractOne(name_norm_lower, variant_keys[initial_variant_count:],
+                                                       scorer=fuzz.ratio, score_cutoff=sheet_score_cutoff)
+                            if added is not None and (best is None or added[1] > best[1]):
+                                best = added
+                        if best is not None:
+                            best_match_in_sheet, row_num = row_map_variants[best[0]]
+                            best_ratio = best[1] / 100
+                    else:
+                        for sheet_name_norm_lower, (sheet_name_original, sheet_row_num) in row_map_variants.items():
+                            ratio = difflib.SequenceMatcher(None, name_norm_lower, sheet_name_norm_lower).ratio()
+                            if ratio > best_ratio and ratio >= SHEET_MATCH_THRESHOLD:
+                                best_ratio = ratio
+                                best_match_in_sheet = sheet_name_original
+                                row_num = sheet_row_num
                     
                     if row_num:
                         matched_count += 1
@@ -578,14 +700,16 @@ def update_google_sheets(all_results, employee_names=None):
                     name_col_index = col_map[master_name_col_header] - 1
                     new_row_data[name_col_index] = original_name_from_result.strip()
                     
-                    # הוסף את השורה החדשה לגיליון
-                    monthly_ws.append_row(new_row_data, value_input_option='USER_ENTERED')
+                    # הוסף את השורה החדשה לגיליון (נשלח בבקשה אחת אחרי הלולאה)
+                    pending_new_rows.append(new_row_data)
                     
                     # עדכן את המיפויים הפנימיים שלנו כדי למצוא את השורה הבאה
                     row_num = len(all_data) + 1
                     all_data.append(new_row_data) # הוסף לגרסה המקומית של הנתונים
                     row_map[original_name_from_result] = row_num
                     if name_norm:
+                        if name_norm not in row_map_variants:
+                            variant_keys.append(name_norm)
                         row_map_variants[name_norm] = (original_name_from_result, row_num)
                 # --- סוף התיקון ---
                 
@@ -595,12 +719,18 @@ def update_google_sheets(all_results, employee_names=None):
                     hours_val = summary.get('total_presence_hours')
                     
                     if hours_val is not None:
-                        col = col_map[TARGET_COLUMN_TITLE]
-                        updates_to_send.append(gspread.Cell(row_num, col, str(hours_val)))
+                        updates_to_send.append((row_num, str(hours_val)))
                     
-            # Send all updates for this period in one batch
+            # New rows go first (in loop order, so their row numbers hold), then the hours
+            if pending_new_rows:
+                monthly_ws.append_rows(pending_new_rows, value_input_option='USER_ENTERED')
+
+            # Send all updates for this period in one batch - contiguous rows share one A1 range
+            # (a row written twice keeps its last value)
             if updates_to_send:
-                monthly_ws.update_cells(updates_to_send, value_input_option='USER_ENTERED')
+                hours_col_letter = col_to_letter(col_map[TARGET_COLUMN_TITLE])
+                monthly_ws.batch_update(_column_ranges(hours_col_letter, dict(updates_to_send)),
+                                        value_input_option='USER_ENTERED')
                 print(f"✅ Google Sheets update complete for '{period_clean}'!")
                 print(f"   - {matched_count} employees matched and updated")
                 print(f"   - {unmatched_count} employees added as new rows")
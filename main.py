@@ -189,7 +189,7 @@ if __name__ == "__main__":
     processed_results = apply_vacation_completion(ALL_RESULTS, master_dict)
 
     # Step 3: Export validated data to Excel with summary table
-    export_summary_excel(processed_results, EMPLOYEE_NAMES, debug_issues=DEBUG_ISSUES)
+    export_summary_excel(processed_results, debug_issues=DEBUG_ISSUES)
     
     # Step 4: Update Google Sheets with validated and matched data
     update_google_sheets(processed_results, EMPLOYEE_NAMES)